@@ -1,14 +1,13 @@
 
-import os
 import asyncio
-from dotenv import load_dotenv
 from supabase import create_client, Client
 
-# Load environment variables
-load_dotenv()
+from fastapi_app.core.config import get_settings
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_KEY") # Use Service Role Key for DDL
+settings = get_settings()
+
+SUPABASE_URL = settings.SUPABASE_URL
+SUPABASE_SERVICE_ROLE_KEY = settings.SUPABASE_SERVICE_KEY # Use Service Role Key for DDL
 
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     print("Error: SUPABASE_URL or SUPABASE_SERVICE_KEY not found in .env")
@@ -2,18 +2,23 @@
 Scoring Agent
 Uses Azure OpenAI to evaluate technical assessment answers.
 """
-import os
-import json
-import os
 import json
+import asyncio
+import httpx
+from typing import AsyncIterator, List, Optional, Tuple
 from openai import AsyncAzureOpenAI
+from core import ai_cache
+from core.config import get_settings
 from core.logging import log_error, api_logger
 
 # Initialize Azure OpenAI Client
-api_key = os.environ.get("AZURE_OPENAI_API_KEY")
-api_version = os.environ.get("AZURE_OPENAI_API_VERSION", "2024-08-01-preview")
-azure_endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
-deployment_name = os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o")
+settings = get_settings()
+api_key = settings.AZURE_OPENAI_API_KEY
+api_version = settings.AZURE_OPENAI_API_VERSION
+azure_endpoint = settings.AZURE_OPENAI_ENDPOINT
+deployment_name = settings.AZURE_OPENAI_DEPLOYMENT_NAME
+# Optional: enables the semantic (near-duplicate) answer cache
+embedding_deployment = settings.AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME
 
 client = None
 if api_key and azure_endpoint:
@@ -21,20 +26,89 @@ if api_key and azure_endpoint:
         client = AsyncAzureOpenAI(
             api_key=api_key,
             api_version=api_version,
-            azure_endpoint=azure_endpoint
+            azure_endpoint=azure_endpoint,
+            # Pooled HTTP/2 client so concurrent scoring (and employee AI) calls
+            # reuse TCP/TLS connections
+            http_client=httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                timeout=60
+            )
         )
     except Exception as e:
         log_error(e, context="AzureOpenAI Client Initialization")
 
+async def aclose() -> None:
+    """Close the shared Azure OpenAI client and its connection pool (app shutdown)."""
+    if client is not None:
+        await client.close()
+
+# Upper bound on answers packed into a single batched prompt (token budget)
+MAX_ITEMS_PER_BATCH = 10
+
+# Process-wide cap on in-flight scoring calls, so concurrent submissions
+# queue here instead of tripping the deployment's rate limit (429s)
+AI_SCORING_CONCURRENCY = settings.AI_SCORING_CONCURRENCY
+_scoring_slots = asyncio.Semaphore(AI_SCORING_CONCURRENCY)
+
+# Answers shorter than this (after stripping) are treated as blank
+MIN_ANSWER_LENGTH = 3
+
+def _trivial_evaluation(desired_answer: str, candidate_answer: str):
+    """Score blank or verbatim answers without calling the model; None otherwise."""
+    answer = (candidate_answer or "").strip()
+    if len(answer) < MIN_ANSWER_LENGTH:
+        return {"score": 0, "reasoning": "No answer provided."}
+    if ai_cache.normalize_text(answer) == ai_cache.normalize_text(desired_answer):
+        return {"score": 10, "reasoning": "Answer matches the desired answer exactly."}
+    return None
+
+async def _embed(text: str) -> Optional[List[float]]:
+    """Embed an answer for the semantic cache; None if disabled or on failure."""
+    if not embedding_deployment:
+        return None
+    try:
+        response = await client.embeddings.create(model=embedding_deployment, input=text)
+        return response.data[0].embedding
+    except Exception as e:
+        log_error(e, context="evaluate_answer:embedding")
+        return None
+
+async def _embed_many(texts: List[str]) -> List[Optional[List[float]]]:
+    """Embed several answers in one call for the semantic cache; all None if disabled or on failure."""
+    if not embedding_deployment or not texts:
+        return [None] * len(texts)
+    try:
+        response = await client.embeddings.create(model=embedding_deployment, input=texts)
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+    except Exception as e:
+        log_error(e, context="evaluate_answers_batch:embedding")
+        return [None] * len(texts)
+
 async def evaluate_answer(question: str, desired_answer: str, candidate_answer: str) -> dict:
     """
     Evaluates a candidate's answer against a desired answer for a specific question.
     Returns a dictionary with 'score' (0-10) and 'reasoning' (text).
     """
+    trivial = _trivial_evaluation(desired_answer, candidate_answer)
+    if trivial is not None:
+        return trivial
+
     if not client:
         api_logger.warning("Azure OpenAI client not initialized. Skipping AI scoring.")
         return {"score": 0, "reasoning": "AI Scoring unavailable (configuration missing)."}
 
+    cached = ai_cache.get_exact(question, desired_answer, candidate_answer)
+    if cached is not None:
+        return cached
+
+    embedding = await _embed(candidate_answer)
+    if embedding is not None:
+        cached = await asyncio.to_thread(ai_cache.get_similar, question, desired_answer, embedding)
+        if cached is not None:
+            ai_cache.set_exact(question, desired_answer, candidate_answer, cached)
+            return cached
+
     prompt = f"""
     You are an expert technical interviewer. Evaluate the candidate's answer based on the question and the desired answer provided by the employer.
     
@@ -55,27 +129,180 @@ async def evaluate_answer(question: str, desired_answer: str, candidate_answer:
     """
 
     try:
-        response = await client.chat.completions.create(
-            model=deployment_name,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant designed to output JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3
-        )
+        async with _scoring_slots:
+            response = await client.chat.completions.create(
+                model=deployment_name,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant designed to output JSON."},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.3
+            )
 
         content = response.choices[0].message.content
         result = json.loads(content)
         
-        return {
+        evaluation = {
             "score": result.get("score", 0),
             "reasoning": result.get("reasoning", "No reasoning provided.")
         }
 
+        ai_cache.set_exact(question, desired_answer, candidate_answer, evaluation)
+        if embedding is not None:
+            ai_cache.set_similar(question, desired_answer, embedding, evaluation)
+
+        return evaluation
+
+    except json.JSONDecodeError as e:
+        log_error(e, context="evaluate_answer", expected=True)
+        return {
+            "score": 0,
+            "reasoning": f"Error during AI evaluation: {str(e)}"
+        }
     except Exception as e:
         log_error(e, context="evaluate_answer")
         return {
             "score": 0,
             "reasoning": f"Error during AI evaluation: {str(e)}"
         }
+
+
+async def _evaluate_chunk(items: List[dict]) -> List[dict]:
+    """Score up to MAX_ITEMS_PER_BATCH answers with one model call."""
+    payload = [
+        {
+            "index": i,
+            "question": item["question"],
+            "desired_answer": item["desired_answer"],
+            "candidate_answer": item["candidate_answer"],
+        }
+        for i, item in enumerate(items)
+    ]
+
+    prompt = f"""
+    You are an expert technical interviewer. Evaluate each candidate answer below based on its question and the desired answer provided by the employer.
+    
+    Items (JSON):
+    {json.dumps(payload, ensure_ascii=False)}
+    
+    Task, for every item:
+    1. Score the answer from 0 to 10 (0 being completely wrong or irrelevant, 10 being perfect).
+    2. Provide a brief reasoning for the score. Explain what was missed or what was good.
+    3. Be critical but fair. If the candidate misses key keywords from the desired answer but explains the concept correctly, give partial credit.
+    Evaluate every item independently of the others.
+
+    Output Format (JSON):
+    {{
+        "results": [
+            {{"index": <integer>, "score": <integer>, "reasoning": "<string>"}}
+        ]
+    }}
+    """
+
+    async with _scoring_slots:
+        response = await client.chat.completions.create(
+            model=deployment_name,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant designed to output JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.3
+        )
+
+    content = response.choices[0].message.content
+    results = {r["index"]: r for r in json.loads(content)["results"]}
+    if set(results) != set(range(len(items))):
+        raise ValueError("Batched evaluation did not return a result for every item")
+
+    evaluations = []
+    for i, item in enumerate(items):
+        evaluation = {
+            "score": results[i].get("score", 0),
+            "reasoning": results[i].get("reasoning", "No reasoning provided.")
+        }
+        ai_cache.set_exact(item["question"], item["desired_answer"], item["candidate_answer"], evaluation)
+        evaluations.append(evaluation)
+    return evaluations
+
+async def iter_answer_evaluations(items: List[dict]) -> AsyncIterator[List[Tuple[int, dict]]]:
+    """
+    Evaluates several answers of one assessment with as few model calls as possible,
+    yielding (item_index, {'score', 'reasoning'}) pairs group by group as they are ready:
+    first everything resolved without the model (trivial answers, exact or
+    near-duplicate cache hits), then one group per batched call.
+    Each item needs 'question', 'desired_answer' and 'candidate_answer'.
+    Falls back to per-item evaluate_answer calls if a batched response can't be parsed.
+    """
+    resolved = []
+    pending = []
+
+    for i, item in enumerate(items):
+        evaluation = _trivial_evaluation(item["desired_answer"], item["candidate_answer"])
+        if evaluation is None and client:
+            evaluation = ai_cache.get_exact(item["question"], item["desired_answer"], item["candidate_answer"])
+        if evaluation is not None:
+            resolved.append((i, evaluation))
+        else:
+            pending.append(i)
+
+    if pending and not client:
+        api_logger.warning("Azure OpenAI client not initialized. Skipping AI scoring.")
+        resolved.extend(
+            (i, {"score": 0, "reasoning": "AI Scoring unavailable (configuration missing)."})
+            for i in pending
+        )
+        pending = []
+
+    # Near-duplicate answers: one embeddings call for everything still pending,
+    # and one worker-thread scan of the semantic cache
+    embeddings = {}
+    if pending and embedding_deployment:
+        vectors = await _embed_many([items[i]["candidate_answer"] for i in pending])
+        embeddings = {i: v for i, v in zip(pending, vectors) if v is not None}
+
+        def lookup_similar():
+            return {
+                i: ai_cache.get_similar(items[i]["question"], items[i]["desired_answer"], v)
+                for i, v in embeddings.items()
+            }
+
+        for i, cached in (await asyncio.to_thread(lookup_similar)).items():
+            if cached is not None:
+                item = items[i]
+                ai_cache.set_exact(item["question"], item["desired_answer"], item["candidate_answer"], cached)
+                resolved.append((i, cached))
+        hits = {i for i, _ in resolved}
+        pending = [i for i in pending if i not in hits]
+
+    if resolved:
+        yield resolved
+
+    # Chunks are scored sequentially: one assessment should not fan out concurrent calls
+    for start in range(0, len(pending), MAX_ITEMS_PER_BATCH):
+        chunk = pending[start:start + MAX_ITEMS_PER_BATCH]
+        chunk_items = [items[i] for i in chunk]
+        try:
+            chunk_results = await _evaluate_chunk(chunk_items)
+            for i, evaluation in zip(chunk, chunk_results):
+                if i in embeddings:
+                    ai_cache.set_similar(items[i]["question"], items[i]["desired_answer"], embeddings[i], evaluation)
+        except Exception as e:
+            log_error(e, context="evaluate_answers_batch")
+            chunk_results = [
+                await evaluate_answer(item["question"], item["desired_answer"], item["candidate_answer"])
+                for item in chunk_items
+            ]
+        yield list(zip(chunk, chunk_results))
+
+async def evaluate_answers_batch(items: List[dict]) -> List[dict]:
+    """
+    Evaluates several answers of one assessment (see iter_answer_evaluations).
+    Returns one {'score', 'reasoning'} dict per item, in input order.
+    """
+    evaluations: List[Optional[dict]] = [None] * len(items)
+    async for group in iter_answer_evaluations(items):
+        for i, evaluation in group:
+            evaluations[i] = evaluation
+    return evaluations
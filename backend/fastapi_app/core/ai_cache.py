@@ -0,0 +1,90 @@
+"""
+AI Scoring Cache for Perfect Fit Backend
+
+Caches answer evaluations so repeat or near-repeat answers to the same
+question skip the Azure OpenAI round trip:
+- Exact cache: keyed by a BLAKE2b digest of the normalized
+  (question, desired_answer, candidate_answer) triple
+- Semantic cache: per-question buckets of answer embeddings, matched by
+  cosine similarity (only used when an embedding deployment is configured)
+
+The desired answer is part of every key, so editing it naturally
+invalidates earlier results for that question.
+"""
+
+import hashlib
+import math
+import unicodedata
+from collections import deque
+from typing import List, Optional
+
+from cachetools import TTLCache
+
+CACHE_TTL_SECONDS = 24 * 60 * 60
+EXACT_CACHE_SIZE = 50_000
+SEMANTIC_BUCKETS = 5_000
+# Bounds the pure-Python similarity scan (~1.5k-dim vectors) per lookup
+SEMANTIC_ENTRIES_PER_BUCKET = 32
+SEMANTIC_SIMILARITY_THRESHOLD = 0.95
+
+_exact_cache: TTLCache = TTLCache(maxsize=EXACT_CACHE_SIZE, ttl=CACHE_TTL_SECONDS)
+_semantic_cache: TTLCache = TTLCache(maxsize=SEMANTIC_BUCKETS, ttl=CACHE_TTL_SECONDS)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Case-, width- and whitespace-insensitive form of a piece of text."""
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(normalize_text(part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def get_exact(question: str, desired_answer: str, candidate_answer: str) -> Optional[dict]:
+    """Return a cached evaluation for this exact (normalized) answer, if any."""
+    return _exact_cache.get(_digest(question, desired_answer, candidate_answer))
+
+
+def set_exact(question: str, desired_answer: str, candidate_answer: str, result: dict) -> None:
+    """Store an evaluation for this exact (normalized) answer."""
+    _exact_cache[_digest(question, desired_answer, candidate_answer)] = result
+
+
+def get_similar(question: str, desired_answer: str, embedding: List[float]) -> Optional[dict]:
+    """
+    Return the evaluation of the most similar cached answer above the threshold.
+
+    CPU-bound (a dot product per cached answer): call it via asyncio.to_thread.
+    """
+    bucket = _semantic_cache.get(_digest(question, desired_answer))
+    if not bucket:
+        return None
+
+    query = _unit(embedding)
+    best_score, best_result = 0.0, None
+    # Snapshot: set_similar may append from the event loop while this runs in a thread
+    for vector, result in list(bucket):
+        similarity = sum(a * b for a, b in zip(query, vector))
+        if similarity > best_score:
+            best_score, best_result = similarity, result
+
+    return best_result if best_score >= SEMANTIC_SIMILARITY_THRESHOLD else None
+
+
+def set_similar(question: str, desired_answer: str, embedding: List[float], result: dict) -> None:
+    """Remember an evaluation alongside the embedding of the answer it scored."""
+    key = _digest(question, desired_answer)
+    bucket = _semantic_cache.get(key)
+    if bucket is None:
+        bucket = deque(maxlen=SEMANTIC_ENTRIES_PER_BUCKET)
+        _semantic_cache[key] = bucket
+    bucket.append((_unit(embedding), result))
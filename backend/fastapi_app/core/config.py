@@ -0,0 +1,45 @@
+"""
+Application Settings for Perfect Fit Backend
+
+Environment variables (and the repository-level .env file, in local dev)
+are parsed once into a Settings object. Use get_settings() rather than
+reading os.environ directly so every module shares the same validated values.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Repository root .env (backend/fastapi_app/core -> repo root)
+ENV_FILE = Path(__file__).resolve().parents[3] / ".env"
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="ignore")
+
+    # Supabase
+    SUPABASE_URL: Optional[str] = None
+    SUPABASE_SERVICE_ROLE_KEY: Optional[str] = None
+    SUPABASE_SERVICE_KEY: Optional[str] = None
+    SUPABASE_JWT_SECRET: Optional[str] = None
+
+    # Azure Blob Storage
+    AZURE_STORAGE_CONNECTION_STRING: Optional[str] = None
+    AZURE_STORAGE_CONTAINER_NAME: Optional[str] = None
+    AZURE_PROFILE_STORAGE_CONTAINER_NAME: str = "candidate-details"
+
+    # Azure OpenAI
+    AZURE_OPENAI_API_KEY: Optional[str] = None
+    AZURE_OPENAI_API_VERSION: str = "2024-08-01-preview"
+    AZURE_OPENAI_ENDPOINT: Optional[str] = None
+    AZURE_OPENAI_DEPLOYMENT_NAME: str = "gpt-4o"
+    AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME: Optional[str] = None
+    AI_SCORING_CONCURRENCY: int = 5
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide Settings, parsed on first use."""
+    return Settings()
@@ -12,12 +12,20 @@ Configuration:
 - ENVIRONMENT: 'development' or 'production' (affects formatting)
 """
 
+import atexit
+import io
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 import os
+import threading
 from datetime import datetime
 from typing import Optional
 
+from starlette.exceptions import HTTPException
+
 try:
     from colorlog import ColoredFormatter
     COLORLOG_AVAILABLE = True
@@ -34,6 +42,13 @@ DEV_FORMAT = "%(log_color)s%(asctime)s | %(levelname)-8s | %(name)-12s | %(messa
 PROD_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)-12s | %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Errors logged without a traceback by log_error
+_EXPECTED_ERRORS = (HTTPException, json.JSONDecodeError)
+
+# Buffered output configuration
+LOG_BUFFER_SIZE = 64 * 1024
+LOG_FLUSH_INTERVAL = 0.2  # seconds
+
 # Color configuration for colorlog
 LOG_COLORS = {
     'DEBUG': 'cyan',
@@ -62,30 +77,83 @@ LOGGER_EMOJIS = {
 }
 
 
+# Precomputed "<logger emoji> <level emoji> " prefixes, one lookup per record
+_PREFIX = {
+    (logger_name, level_name): f"{logger_emoji} {level_emoji} "
+    for logger_name, logger_emoji in LOGGER_EMOJIS.items()
+    for level_name, level_emoji in LEVEL_EMOJIS.items()
+}
+
+
 class EmojiFormatter(logging.Formatter):
     """Custom formatter that adds emojis in development mode."""
     
     def __init__(self, fmt: str, datefmt: str, use_emojis: bool = True):
+        self.use_emojis = use_emojis and IS_DEVELOPMENT
+        if self.use_emojis:
+            # Prefix via the format string so record.msg / %-args stay untouched
+            fmt = fmt.replace("%(message)s", "%(prefix)s%(message)s")
         super().__init__(fmt, datefmt)
-        self.use_emojis = use_emojis
     
     def format(self, record: logging.LogRecord) -> str:
         # Add emoji prefix based on logger name and level
-        if self.use_emojis and IS_DEVELOPMENT:
-            logger_emoji = LOGGER_EMOJIS.get(record.name, '📋')
-            level_emoji = LEVEL_EMOJIS.get(record.levelname, '')
-            record.msg = f"{logger_emoji} {level_emoji} {record.msg}"
+        if self.use_emojis:
+            prefix = _PREFIX.get((record.name, record.levelname))
+            if prefix is None:
+                prefix = f"📋 {LEVEL_EMOJIS.get(record.levelname, '')} "
+            record.__dict__["prefix"] = prefix
         return super().format(record)
 
 
-def get_console_handler() -> logging.StreamHandler:
-    """Create and configure console handler with appropriate formatter."""
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(LOG_LEVEL)
-    
+class PlainFormatter(logging.Formatter):
+    """
+    Production formatter equivalent to PROD_FORMAT.
+
+    Builds the line with a single %-operation instead of going through
+    Formatter.formatMessage, and reuses the timestamp string for every record
+    logged within the same second (DATE_FORMAT has one-second resolution).
+    """
+
+    def __init__(self, datefmt: str = DATE_FORMAT):
+        super().__init__(PROD_FORMAT, datefmt)
+        self._last_second = -1
+        self._last_asctime = ""
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        second = int(record.created)
+        if second != self._last_second:
+            self._last_asctime = super().formatTime(record, datefmt)
+            self._last_second = second
+        return self._last_asctime
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = "%s | %-8s | %-12s | %s" % (
+            self.formatTime(record, self.datefmt),
+            record.levelname,
+            record.name,
+            record.getMessage(),
+        )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        if record.stack_info:
+            line = f"{line}\n{self.formatStack(record.stack_info)}"
+        return line
+
+
+# Records are handed off to a background listener thread which owns the
+# (buffered) stdout stream, so request handlers never block on write().
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+_flush_stop = threading.Event()
+
+
+def get_formatter() -> logging.Formatter:
+    """Create the formatter appropriate for the current environment."""
     if IS_DEVELOPMENT and COLORLOG_AVAILABLE:
         # Use colored formatter in development
-        formatter = ColoredFormatter(
+        return ColoredFormatter(
             DEV_FORMAT,
             datefmt=DATE_FORMAT,
             reset=True,
@@ -93,18 +161,77 @@ def get_console_handler() -> logging.StreamHandler:
             secondary_log_colors={},
             style='%'
         )
-    else:
-        # Use plain formatter in production
-        formatter = EmojiFormatter(
-            PROD_FORMAT,
-            datefmt=DATE_FORMAT,
-            use_emojis=False
-        )
-    
-    handler.setFormatter(formatter)
+
+    if IS_DEVELOPMENT:
+        # Development without colorlog: same plain output as before, no emojis
+        return EmojiFormatter(PROD_FORMAT, datefmt=DATE_FORMAT, use_emojis=False)
+
+    # Use plain formatter in production
+    return PlainFormatter(datefmt=DATE_FORMAT)
+
+
+def get_console_handler() -> logging.Handler:
+    """Create a non-blocking handler that enqueues records for the listener."""
+    handler = logging.handlers.QueueHandler(_log_queue)
+    handler.setLevel(LOG_LEVEL)
     return handler
 
 
+def _open_buffered_stdout() -> io.TextIOBase:
+    """Wrap stdout in a 64 KiB buffer; fall back to sys.stdout if it has no fd."""
+    try:
+        raw = io.FileIO(sys.stdout.fileno(), "w", closefd=False)
+    except (AttributeError, OSError, ValueError):
+        return sys.stdout
+
+    return io.TextIOWrapper(
+        io.BufferedWriter(raw, buffer_size=LOG_BUFFER_SIZE),
+        encoding=getattr(sys.stdout, "encoding", None) or "utf-8",
+        errors="backslashreplace",
+        line_buffering=False,
+    )
+
+
+def _flush_periodically(handler: logging.Handler) -> None:
+    """Flush buffered output every LOG_FLUSH_INTERVAL so quiet logs still appear."""
+    while not _flush_stop.wait(LOG_FLUSH_INTERVAL):
+        handler.flush()
+
+
+def _stop_listener(handler: logging.Handler) -> None:
+    """Drain the queue and flush remaining output on interpreter exit."""
+    global _listener
+    _flush_stop.set()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    handler.flush()
+
+
+def start_log_listener() -> None:
+    """Start the background thread that writes queued records to stdout."""
+    global _listener
+    if _listener is not None:
+        return
+
+    target_handler = logging.StreamHandler(_open_buffered_stdout())
+    target_handler.setLevel(LOG_LEVEL)
+    target_handler.setFormatter(get_formatter())
+
+    _listener = logging.handlers.QueueListener(
+        _log_queue, target_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    threading.Thread(
+        target=_flush_periodically,
+        args=(target_handler,),
+        name="log-flush",
+        daemon=True,
+    ).start()
+    atexit.register(_stop_listener, target_handler)
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Get or create a logger with the specified name.
@@ -137,30 +264,45 @@ auth_logger = get_logger("auth")
 # Utility functions for structured logging
 def log_request(method: str, path: str, client_ip: Optional[str] = None) -> None:
     """Log incoming HTTP request."""
-    api_logger.info(f"→ {method} {path} [from: {client_ip or 'unknown'}]")
+    api_logger.info("→ %s %s [from: %s]", method, path, client_ip or "unknown")
 
 
 def log_response(method: str, path: str, status_code: int, duration_ms: float) -> None:
     """Log HTTP response with timing."""
     level = logging.INFO if status_code < 400 else logging.WARNING if status_code < 500 else logging.ERROR
-    api_logger.log(level, f"← {method} {path} [{status_code}] ({duration_ms:.2f}ms)")
+    api_logger.log(level, "← %s %s [%s] (%.2fms)", method, path, status_code, duration_ms)
 
 
 def log_db_query(query: str, table: str, duration_ms: Optional[float] = None) -> None:
     """Log database query."""
-    duration_str = f" ({duration_ms:.2f}ms)" if duration_ms else ""
-    db_logger.debug(f"Query: {query} on {table}{duration_str}")
+    if not db_logger.isEnabledFor(logging.DEBUG):
+        return
+    if duration_ms:
+        db_logger.debug("Query: %s on %s (%.2fms)", query, table, duration_ms)
+    else:
+        db_logger.debug("Query: %s on %s", query, table)
 
 
 def log_db_result(table: str, count: int) -> None:
     """Log database query result."""
-    db_logger.debug(f"Result: {count} records from {table}")
+    if not db_logger.isEnabledFor(logging.DEBUG):
+        return
+    db_logger.debug("Result: %d records from %s", count, table)
 
 
-def log_error(error: Exception, context: Optional[str] = None) -> None:
-    """Log exception with context."""
+def log_error(error: Exception, context: Optional[str] = None, *, expected: bool = False) -> None:
+    """
+    Log exception with context.
+
+    Expected errors (HTTPExceptions, malformed JSON, or anything the caller
+    flags with expected=True) are logged as a one-line warning without the
+    traceback, which is costly to format for frequent failures such as 401s.
+    """
     context_str = f"[{context}] " if context else ""
-    error_logger.error(f"{context_str}{type(error).__name__}: {str(error)}", exc_info=True)
+    if expected or isinstance(error, _EXPECTED_ERRORS):
+        error_logger.warning("%s%s: %s", context_str, type(error).__name__, error)
+        return
+    error_logger.error("%s%s: %s", context_str, type(error).__name__, error, exc_info=True)
 
 
 def log_ai_event(event: str, details: Optional[str] = None) -> None:
@@ -177,20 +319,44 @@ def log_auth_event(event: str, user_id: Optional[str] = None, success: bool = Tr
     auth_logger.log(level, f"{status} {event}{user_str}")
 
 
+# Third-party loggers whose sub-WARNING records are never shown
+NOISY_LOGGERS = frozenset({
+    "httpx",
+    "httpcore",
+    "urllib3",
+    "azure.core.pipeline.policies.http_logging_policy",
+})
+_NOISY_PREFIXES = tuple(f"{name}." for name in NOISY_LOGGERS)
+
+
+class _DropNoisy(logging.Filter):
+    """Drop below-WARNING records from NOISY_LOGGERS and their children."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        name = record.name
+        return not (name in NOISY_LOGGERS or name.startswith(_NOISY_PREFIXES))
+
+
 # Initialize logging on module import
 def setup_logging() -> None:
     """Initialize logging configuration."""
+    start_log_listener()
+
     # Configure root logger to catch any unconfigured loggers
     root_logger = logging.getLogger()
     root_logger.setLevel(LOG_LEVEL)
     
     if not root_logger.handlers:
-        root_logger.addHandler(get_console_handler())
+        root_handler = get_console_handler()
+        root_handler.addFilter(_DropNoisy())
+        root_logger.addHandler(root_handler)
     
-    # Suppress noisy third-party loggers
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("httpcore").setLevel(logging.WARNING)
-    logging.getLogger("urllib3").setLevel(logging.WARNING)
+    # Suppress noisy third-party loggers. The level short-circuits record
+    # creation; _DropNoisy catches children that set a lower level themselves.
+    for name in NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
     
     api_logger.info(f"Logging initialized | Level: {LOG_LEVEL} | Environment: {ENVIRONMENT}")
 
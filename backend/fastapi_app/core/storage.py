@@ -1,16 +1,111 @@
-import os
-from datetime import datetime, timedelta
+import time
+import functools
+from datetime import datetime, timezone
+from typing import List, Optional
 from urllib.parse import urlparse, unquote
 from azure.storage.blob import generate_blob_sas, BlobSasPermissions, BlobServiceClient
+from core.config import get_settings
 from core.logging import api_logger, log_error
 
-AZURE_CONNECTION_STRING = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
+AZURE_CONNECTION_STRING = get_settings().AZURE_STORAGE_CONNECTION_STRING
 
+@functools.lru_cache(maxsize=1)
 def get_blob_service_client():
+    """Return a shared BlobServiceClient so its HTTP pipeline is reused."""
     if not AZURE_CONNECTION_STRING:
         raise ValueError("AZURE_STORAGE_CONNECTION_STRING not set")
     return BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
 
+@functools.lru_cache(maxsize=1)
+def _parsed_conn_str(conn_str: str) -> tuple:
+    """Parse (AccountName, AccountKey) out of a connection string once."""
+    params = dict(item.split('=', 1) for item in conn_str.split(';') if '=' in item)
+    return params.get('AccountName'), params.get('AccountKey')
+
+# Signing inputs are effectively constant: resolve them once at import
+_READ_PERM = BlobSasPermissions(read=True)
+_ACCOUNT_NAME, _ACCOUNT_KEY = None, None
+if AZURE_CONNECTION_STRING:
+    try:
+        _ACCOUNT_NAME, _ACCOUNT_KEY = _parsed_conn_str(AZURE_CONNECTION_STRING)
+    except Exception as e:
+        log_error(e, context="storage: parse AZURE_STORAGE_CONNECTION_STRING")
+
+# SAS expiries are shared by every signing within the same window
+EXPIRY_WINDOW_SECONDS = 30
+
+@functools.lru_cache(maxsize=8)
+def _expiry_for_window(window: int, expiry_hours: int) -> datetime:
+    # Measured from the end of the window so tokens never live shorter than expiry_hours
+    return datetime.fromtimestamp((window + 1) * EXPIRY_WINDOW_SECONDS + expiry_hours * 3600, tz=timezone.utc)
+
+def _now_plus(expiry_hours: int) -> datetime:
+    """Return a UTC expiry expiry_hours from now, reused within a 30s window."""
+    return _expiry_for_window(int(time.time()) // EXPIRY_WINDOW_SECONDS, expiry_hours)
+
+def _get_account_credentials() -> tuple:
+    """Return (account_name, account_key), or (None, None) if unavailable."""
+    if _ACCOUNT_NAME and _ACCOUNT_KEY:
+        return _ACCOUNT_NAME, _ACCOUNT_KEY
+
+    if not AZURE_CONNECTION_STRING:
+        # Attempt to reload from os.environ in case it was set after module load
+        from os import environ
+        conn_str = environ.get("AZURE_STORAGE_CONNECTION_STRING")
+        if conn_str:
+            # Update module level variable
+            globals()['AZURE_CONNECTION_STRING'] = conn_str
+        else:
+            api_logger.critical("AZURE_STORAGE_CONNECTION_STRING not set - cannot sign Blob URL")
+            return None, None
+
+    # Parse connection string to get account name and key (cached)
+    account_name, account_key = _parsed_conn_str(AZURE_CONNECTION_STRING)
+
+    if not account_name or not account_key:
+        api_logger.critical("Could not parse AccountName or AccountKey from connection string")
+        return None, None
+
+    return account_name, account_key
+
+def _sign_with_credentials(
+    blob_url: str,
+    account_name: str,
+    account_key: str,
+    expiry: datetime,
+    content_disposition: str = None,
+) -> str:
+    """Sign a single blob URL with already-resolved account credentials."""
+    # Extract container and blob name from URL
+    base_url = blob_url.split('?', 1)[0]
+    try:
+        parsed = urlparse(base_url)
+        path_parts = parsed.path.lstrip('/').split('/', 1)
+        if len(path_parts) != 2:
+            # Try handling cases where container is not first path segment (unlikely in standard Azure URLs but possible)
+            return blob_url
+        
+        container_name, blob_name = path_parts
+        
+        # Handle encoded characters (spaces, etc)
+        blob_name = unquote(blob_name)
+        
+    except Exception:
+        return blob_url
+
+    sas_token = generate_blob_sas(
+        account_name=account_name,
+        container_name=container_name,
+        blob_name=blob_name,
+        account_key=account_key,
+        permission=_READ_PERM,
+        expiry=expiry,
+        content_disposition=content_disposition
+    )
+    
+    # base_url has existing query parameters stripped to avoid duplication/conflict
+    return f"{base_url}?{sas_token}"
+
 def sign_blob_url(blob_url: str, expiry_hours: int = 1, as_attachment: bool = False, filename: str = None) -> str:
     """
     Appends a SAS token to the blob URL to allow secure read access.
@@ -25,40 +120,8 @@ def sign_blob_url(blob_url: str, expiry_hours: int = 1, as_attachment: bool = Fa
         return blob_url
         
     try:
-        if not AZURE_CONNECTION_STRING:
-            # Attempt to reload from os.environ in case it was set after module load
-            from os import environ
-            conn_str = environ.get("AZURE_STORAGE_CONNECTION_STRING")
-            if conn_str:
-                # Update module level variable
-                globals()['AZURE_CONNECTION_STRING'] = conn_str
-            else:
-                api_logger.critical("AZURE_STORAGE_CONNECTION_STRING not set - cannot sign Blob URL")
-                return blob_url
-
-        # Parse connection string to get account name and key
-        params = dict(item.split('=', 1) for item in AZURE_CONNECTION_STRING.split(';') if '=' in item)
-        account_name = params.get('AccountName')
-        account_key = params.get('AccountKey')
-
-        if not account_name or not account_key:
-             api_logger.critical("Could not parse AccountName or AccountKey from connection string")
-             return blob_url
-
-        # Extract container and blob name from URL
-        try:
-            parsed = urlparse(blob_url)
-            path_parts = parsed.path.lstrip('/').split('/', 1)
-            if len(path_parts) != 2:
-                # Try handling cases where container is not first path segment (unlikely in standard Azure URLs but possible)
-                return blob_url
-            
-            container_name, blob_name = path_parts
-            
-            # Handle encoded characters (spaces, etc)
-            blob_name = unquote(blob_name)
-            
-        except Exception:
+        account_name, account_key = _get_account_credentials()
+        if not account_name:
             return blob_url
 
         # content_disposition configuration
@@ -68,20 +131,14 @@ def sign_blob_url(blob_url: str, expiry_hours: int = 1, as_attachment: bool = Fa
         elif filename:
             content_disposition = f"inline; filename={filename}"
 
-        sas_token = generate_blob_sas(
-            account_name=account_name,
-            container_name=container_name,
-            blob_name=blob_name,
-            account_key=account_key,
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(hours=expiry_hours),
+        return _sign_with_credentials(
+            blob_url,
+            account_name,
+            account_key,
+            expiry=_now_plus(expiry_hours),
             content_disposition=content_disposition
         )
         
-        # Strip existing query parameters to avoid duplication/conflict
-        base_url = blob_url.split('?')[0]
-        return f"{base_url}?{sas_token}"
-        
     except Exception as e:
         # print to stdout to ensure we see it
         print(f"ERROR in sign_blob_url: {e}")
@@ -89,3 +146,36 @@ def sign_blob_url(blob_url: str, expiry_hours: int = 1, as_attachment: bool = Fa
         traceback.print_exc()
         log_error(e, context="sign_blob_url")
         return blob_url
+
+def sign_blob_urls(blob_urls: List[Optional[str]], expiry_hours: int = 1) -> List[Optional[str]]:
+    """
+    Sign a batch of blob URLs for read access.
+
+    Credentials and expiry are resolved once for the whole batch. Signing is
+    CPU-bound, so async callers should run this via asyncio.to_thread.
+    Empty entries are passed through unchanged and the output order matches the input.
+    """
+    if not any(blob_urls):
+        return list(blob_urls)
+
+    try:
+        account_name, account_key = _get_account_credentials()
+        if not account_name:
+            return list(blob_urls)
+
+        expiry = _now_plus(expiry_hours)
+
+        def sign(url):
+            if not url:
+                return url
+            try:
+                return _sign_with_credentials(url, account_name, account_key, expiry)
+            except Exception as e:
+                log_error(e, context="sign_blob_urls")
+                return url
+
+        return [sign(url) for url in blob_urls]
+
+    except Exception as e:
+        log_error(e, context="sign_blob_urls")
+        return list(blob_urls)
@@ -1,11 +1,39 @@
-import os
+import asyncio
+import hashlib
+import time
+from functools import lru_cache
+
 import jwt
+import httpx
+from cachetools import TLRUCache, TTLCache
 from fastapi import Header, HTTPException, status
 from gotrue import AsyncGoTrueClient
+from gotrue.errors import AuthApiError
 from postgrest import AsyncPostgrestClient
 
+from core.config import get_settings
 from core.logging import auth_logger, db_logger, log_error
 
+# Connection pool shared by the auth and database clients
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+HTTP_TIMEOUT = httpx.Timeout(10.0)
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose session is built on a shared httpx transport."""
+
+    def __init__(self, base_url: str, *, transport: httpx.AsyncBaseTransport, **kwargs):
+        # create_session() runs inside the base constructor, so set this first
+        self._transport = transport
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=self._transport
+        )
+
 # Custom Client to avoid 'supafunc'/'pyroaring' dependency issues on Windows
 class CustomSupabaseClient:
     def __init__(self, url: str, key: str):
@@ -16,6 +44,13 @@ class CustomSupabaseClient:
             "Authorization": f"Bearer {key}",
             "Content-Type": "application/json"
         }
+
+        # A single transport owns the keep-alive/HTTP2 connection pool, so
+        # GoTrue and PostgREST calls to the same Supabase host reuse sockets.
+        self._transport = httpx.AsyncHTTPTransport(http2=True, limits=HTTP_LIMITS)
+        
+        # General-purpose client on the shared pool (GoTrue, JWKS fetches)
+        self.http_client = httpx.AsyncClient(transport=self._transport, timeout=HTTP_TIMEOUT)
         
         # Initialize Auth (GoTrue)
         self.auth = AsyncGoTrueClient(
@@ -23,100 +58,207 @@ class CustomSupabaseClient:
             headers={
                 "apikey": key,
                 "Authorization": f"Bearer {key}"
-            }
+            },
+            http_client=self.http_client
         )
         
-        # Initialize DB (PostgREST)
-        self.postgrest = AsyncPostgrestClient(
+        # Initialize DB (PostgREST) with its session on the shared transport
+        self.postgrest = PooledPostgrestClient(
             base_url=f"{url}/rest/v1",
-            headers=self.headers
+            headers=self.headers,
+            timeout=HTTP_TIMEOUT,
+            transport=self._transport
         )
 
     def table(self, table_name: str):
         return self.postgrest.from_(table_name)
 
-from dotenv import load_dotenv
+    def rpc(self, fn: str, params: dict = None):
+        return self.postgrest.rpc(fn, params or {})
 
-from pathlib import Path
+    async def aclose(self):
+        """Close the underlying HTTP clients and their shared connection pool."""
+        await self.postgrest.aclose()
+        await self._transport.aclose()
 
-# Load environment variables (robust absolute path)
-env_path = Path(__file__).resolve().parent.parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
+settings = get_settings()
 
 # Initialize Supabase Client once
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+url: str = settings.SUPABASE_URL
+key: str = settings.SUPABASE_SERVICE_ROLE_KEY
 
 if not url or not key:
     raise ValueError("Supabase URL and Service Role Key must be set in .env")
 
-# Use our custom client instead of the official 'supabase' package
-supabase = CustomSupabaseClient(url, key)
+@lru_cache(maxsize=1)
+def get_supabase_client() -> CustomSupabaseClient:
+    """
+    Return the process-wide Supabase client.
+    Every caller (routes, background tasks, auth) shares one client and its connection pool.
+    """
+    # Use our custom client instead of the official 'supabase' package
+    return CustomSupabaseClient(url, key)
+
+supabase = get_supabase_client()
 
 # JWT Configuration for local verification
-JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
+JWT_SECRET = settings.SUPABASE_JWT_SECRET
 SUPABASE_ALGORITHM = "HS256"
+# Asymmetric signing keys are published by GoTrue as a JWKS document
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256"}
+JWKS_URL = f"{url}/auth/v1/.well-known/jwks.json"
+JWKS_CACHE_TTL_SECONDS = 3600
 
 if not JWT_SECRET:
-    auth_logger.warning("SUPABASE_JWT_SECRET not set - falling back to API verification")
+    auth_logger.warning("SUPABASE_JWT_SECRET not set - HS256 tokens fall back to API verification")
+
+# Decode arguments are fixed per algorithm; build them once instead of per call
+_JWT_KEY = JWT_SECRET.encode() if JWT_SECRET else None
+_JWT_ALGORITHMS = {alg: [alg] for alg in (SUPABASE_ALGORITHM, *ASYMMETRIC_ALGORITHMS)}
+_JWT_AUDIENCE = "authenticated"
 
-def get_supabase():
+_jwks_cache: TTLCache = TTLCache(maxsize=1, ttl=JWKS_CACHE_TTL_SECONDS)
+
+# Profile (role, full_name, email) lookups keyed by user id.
+# Short TTL bounds how long a role change takes to apply if not invalidated.
+ROLE_CACHE_TTL_SECONDS = 60
+_role_cache: TTLCache = TTLCache(maxsize=10_000, ttl=ROLE_CACHE_TTL_SECONDS)
+
+# Verified tokens (decoded payload or GoTrue user) keyed by a digest of the raw token.
+# Entries never outlive the token's own exp claim.
+TOKEN_CACHE_TTL_SECONDS = 300
+
+def _token_ttu(_key, value, now):
+    exp, _ = value
+    return min(exp, now + TOKEN_CACHE_TTL_SECONDS)
+
+_token_cache: TLRUCache = TLRUCache(maxsize=10_000, ttu=_token_ttu, timer=time.time)
+
+def _token_key(kind: str, token: str) -> tuple:
+    return kind, hashlib.sha256(token.encode()).digest()
+
+async def get_supabase() -> CustomSupabaseClient:
+    """
+    FastAPI dependency for the shared client.
+    Declared async so FastAPI resolves it inline instead of via the threadpool.
+    """
     return supabase
 
-async def verify_admin(x_supabase_auth: str = Header(None)):
+# Tables touched by the hot endpoints; queried once at startup
+WARMUP_TABLES = ("profiles", "assessments", "assessment_scores", "assessment_responses")
+
+async def warm_up_supabase() -> None:
     """
-    Verifies that the request comes from an authenticated admin or hr user.
+    Open the pooled connection and load PostgREST's schema cache before the
+    first real request. Failures are logged and never block startup.
     """
-    if not x_supabase_auth:
-        auth_logger.warning("Auth attempt without token")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing Auth Token",
-        )
-    
-    try:
-        # Check if the token is valid and get user
-        # gotrue-py get_user takes just the jwt
-        user_response = await supabase.auth.get_user(x_supabase_auth)
-        
-        # The structure of user_response might differ slightly in direct gotrue usage vs supabase wrapper
-        # SyncGoTrueClient.get_user returns a UserResponse object usually
-        
-        if not user_response or not user_response.user:
-            auth_logger.warning("Auth attempt with invalid token")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid Token",
-            )
-            
-        user_id = user_response.user.id
-        auth_logger.debug(f"Token validated for user: {user_id}")
-        
-        # Check role in profiles table
-        profile = await supabase.table("profiles").select("role").eq("id", user_id).single().execute()
-        
-        if not profile.data or profile.data.get("role") not in ["admin", "hr"]:
-            auth_logger.warning(f"Access denied - insufficient privileges for user: {user_id}")
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Admin or HR privileges required",
-            )
-        
-        auth_logger.info(f"Admin access granted for user: {user_id} (role: {profile.data.get('role')})")
-        return {
-            "id": str(user_id),
-            "email": user_response.user.email,
-            "role": profile.data.get("role")
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        log_error(e, context="verify_admin")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication failed",
-        )
+    async def probe(table: str) -> None:
+        # Built inside the coroutine so a client-side error (e.g. an unsupported
+        # select() argument) is reported like any other failed probe
+        try:
+            await supabase.table(table).select("id").limit(1).execute()
+        except Exception as e:
+            db_logger.warning(f"Warmup query on {table} failed: {e}")
+
+    await asyncio.gather(*(probe(table) for table in WARMUP_TABLES))
+
+def invalidate_cached_role(user_id: str) -> None:
+    """Drop a cached profile so the next request re-reads the role."""
+    _role_cache.pop(str(user_id), None)
+
+async def _get_jwks(refresh: bool = False) -> dict:
+    """Return the project's signing keys by kid, cached for JWKS_CACHE_TTL_SECONDS."""
+    keys = None if refresh else _jwks_cache.get("keys")
+    if keys is None:
+        response = await supabase.http_client.get(JWKS_URL, headers={"apikey": supabase.key})
+        response.raise_for_status()
+        jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        keys = {k.key_id: k for k in jwk_set.keys}
+        _jwks_cache["keys"] = keys
+    return keys
+
+async def _get_signing_key(kid: str):
+    keys = await _get_jwks()
+    if kid not in keys:
+        # Keys may have rotated since the last fetch
+        keys = await _get_jwks(refresh=True)
+    if kid not in keys:
+        raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+    return keys[kid].key
+
+async def decode_supabase_jwt(token: str) -> dict:
+    """
+    Verify a Supabase access token locally.
+    HS256 tokens are checked with SUPABASE_JWT_SECRET; RS256/ES256 tokens
+    against the cached JWKS. Raises jwt.InvalidTokenError (or a subclass)
+    if the token cannot be verified locally.
+    """
+    cache_key = _token_key("jwt", token)
+    cached = _token_cache.get(cache_key)
+    if cached is not None:
+        return cached[1]
+
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+
+    if algorithm == SUPABASE_ALGORITHM:
+        if not _JWT_KEY:
+            raise jwt.InvalidTokenError("SUPABASE_JWT_SECRET not configured")
+        signing_key = _JWT_KEY
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        try:
+            signing_key = await _get_signing_key(header.get("kid"))
+        except (httpx.HTTPError, jwt.PyJWKError, jwt.PyJWKSetError, ValueError) as e:
+            raise jwt.InvalidTokenError(f"Could not load JWKS: {e}")
+    else:
+        raise jwt.InvalidTokenError(f"Unsupported algorithm: {algorithm}")
+
+    payload = jwt.decode(
+        token,
+        signing_key,
+        algorithms=_JWT_ALGORITHMS[algorithm],
+        audience=_JWT_AUDIENCE
+    )
+    if not payload.get("sub"):
+        raise jwt.InvalidTokenError("Missing 'sub' claim")
+    if payload.get("exp"):
+        _token_cache[cache_key] = (payload["exp"], payload)
+    return payload
+
+async def get_user_from_api(token: str):
+    """
+    Verify a token with the Supabase Auth API and return its user (or None).
+    Successful lookups are cached until the token's exp claim.
+    """
+    cache_key = _token_key("api", token)
+    cached = _token_cache.get(cache_key)
+    if cached is not None:
+        return cached[1]
+
+    user_response = await supabase.auth.get_user(token)
+    user = user_response.user if user_response else None
+    if user:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        if exp:
+            _token_cache[cache_key] = (exp, user)
+    return user
+
+async def get_profile(user_id: str) -> dict:
+    """
+    Fetch role, full_name and email for a user, served from the TTL cache when possible.
+    Returns an empty dict if the user has no profile row.
+    """
+    user_id = str(user_id)
+    cached = _role_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    # limit(1) instead of single(): a missing row is an empty list, not an error
+    profile = await supabase.table("profiles").select("role, full_name, email").eq("id", user_id).limit(1).execute()
+    data = profile.data[0] if profile.data else {}
+    if data:
+        _role_cache[user_id] = data
+    return data
 
 from fastapi import Depends
 
@@ -131,7 +273,7 @@ async def get_current_user(x_supabase_auth: str = Header(None)):
     """
     Get current authenticated user without role check.
     Uses local JWT verification for improved latency (~200ms saved per request).
-    Falls back to Supabase API if JWT_SECRET is not configured.
+    Falls back to Supabase API if the token can't be verified locally.
     """
     if not x_supabase_auth:
         auth_logger.warning("Auth attempt without token")
@@ -141,48 +283,44 @@ async def get_current_user(x_supabase_auth: str = Header(None)):
         )
     
     # Try local verification first (faster)
-    if JWT_SECRET:
-        try:
-            payload = jwt.decode(
-                x_supabase_auth,
-                JWT_SECRET,
-                algorithms=[SUPABASE_ALGORITHM],
-                audience="authenticated"
-            )
-            user_id = payload.get("sub")
-            email = payload.get("email")
-            
-            if not user_id:
-                raise jwt.InvalidTokenError("Missing 'sub' claim")
-            
-            auth_logger.debug(f"Local JWT verification success for user: {user_id}")
-            return LocalUser(id=user_id, email=email)
-            
-        except jwt.ExpiredSignatureError:
-            auth_logger.warning("Token expired (local verification)")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token expired"
-            )
-        except jwt.InvalidTokenError as e:
-            # Local verification failed - fall through to API verification
-            auth_logger.debug(f"Local JWT failed, trying API fallback: {e}")
+    try:
+        payload = await decode_supabase_jwt(x_supabase_auth)
+        user_id = payload["sub"]
+        email = payload.get("email")
+        
+        auth_logger.debug(f"Local JWT verification success for user: {user_id}")
+        return LocalUser(id=user_id, email=email)
+        
+    except jwt.ExpiredSignatureError:
+        auth_logger.warning("Token expired (local verification)")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token expired"
+        )
+    except jwt.InvalidTokenError as e:
+        # Local verification failed - fall through to API verification
+        auth_logger.debug(f"Local JWT failed, trying API fallback: {e}")
     
     # Fallback to Supabase API verification
     try:
-        user_response = await supabase.auth.get_user(x_supabase_auth)
-        if not user_response or not user_response.user:
+        user = await get_user_from_api(x_supabase_auth)
+        if not user:
             auth_logger.warning("Invalid token")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid Token"
             )
         
-        return user_response.user
+        return user
     except HTTPException:
         raise
     except Exception as e:
-        log_error(e, context="get_current_user")
+        # A rejected or malformed token is routine; GoTrue 5xx and transport
+        # errors are real failures and keep their traceback
+        rejected = isinstance(e, jwt.InvalidTokenError) or (
+            isinstance(e, AuthApiError) and e.status is not None and e.status < 500
+        )
+        log_error(e, context="get_current_user", expected=rejected)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication failed"
@@ -191,7 +329,7 @@ async def get_current_user(x_supabase_auth: str = Header(None)):
 async def get_user_with_role(user = Depends(get_current_user)):
     """Get current user with their role from profiles table."""
     try:
-        profile = await supabase.table("profiles").select("role, full_name, email").eq("id", str(user.id)).single().execute()
+        profile = await get_profile(user.id)
         
         # If no profile, they might be a new candidate. Default to 'candidate' if not found?
         # Or better, create a basic profile? For now, just return what we have or error.
@@ -201,10 +339,10 @@ async def get_user_with_role(user = Depends(get_current_user)):
         full_name = None
         email = None
         
-        if profile.data:
-            role = profile.data.get("role", "candidate")
-            full_name = profile.data.get("full_name")
-            email = profile.data.get("email")
+        if profile:
+            role = profile.get("role", "candidate")
+            full_name = profile.get("full_name")
+            email = profile.get("email")
         
         return {
             "id": str(user.id),
@@ -222,6 +360,30 @@ async def get_user_with_role(user = Depends(get_current_user)):
             "email": None
         }
 
+def require_roles(*roles: str):
+    """
+    Build a dependency that only admits users whose profile role is in `roles`.
+    Reuses get_user_with_role, so a request decodes its token once and reads
+    the (cached) profile once, however many role checks it declares.
+    """
+    allowed = frozenset(roles)
+    detail = "Admin or HR privileges required" if allowed == {"admin", "hr"} else "Insufficient privileges"
+
+    async def dependency(user = Depends(get_user_with_role)):
+        if user["role"] not in allowed:
+            auth_logger.warning(f"Access denied - insufficient privileges for user: {user['id']}")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=detail,
+            )
+        auth_logger.debug(f"Access granted for user: {user['id']} (role: {user['role']})")
+        return user
+
+    return dependency
+
+# Verifies that the request comes from an authenticated admin or hr user.
+verify_admin = require_roles("admin", "hr")
+
 # Alias for backward compatibility or clearer intent
 # Since verify_admin already checks for ["admin", "hr"], we can reuse it.
 verify_hr_or_admin = verify_admin
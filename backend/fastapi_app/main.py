@@ -1,11 +1,19 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+import asyncio
 import os
 import time
 
+from core.config import ENV_FILE
+
+# Load environment variables before the routers are imported: several modules
+# (and the libraries they configure) read os.environ at import time.
+# Only applies in local dev; in containers, env vars are injected.
+load_dotenv(dotenv_path=ENV_FILE, override=False)
+
 from routers import admin
 from routers import jobs
 from routers import candidates
@@ -23,9 +31,6 @@ from core.logging import (
     setup_logging,
 )
 
-# Load environment variables (only applies in local dev; in containers, env vars are injected)
-load_dotenv(dotenv_path="../../.env", override=False)
-
 # Initialize logging
 setup_logging()
 
@@ -37,12 +42,29 @@ async def lifespan(app: FastAPI):
     # Startup
     api_logger.info("🚀 Perfect Fit Admin API starting up...")
     api_logger.info(f"📍 Environment: {os.environ.get('ENVIRONMENT', 'development')}")
+    # Python 3.12+: tasks that finish without suspending (cache hits, early
+    # returns inside gather) complete inline instead of via the event loop
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    from dependencies import warm_up_supabase
+    await warm_up_supabase()
     yield
     # Shutdown
     api_logger.info("👋 Perfect Fit Admin API shutting down...")
-
-
-app = FastAPI(title="Perfect Fit Admin API", lifespan=lifespan)
+    from dependencies import get_supabase_client
+    from agents.scoring_agent import aclose as close_ai_client
+    from routers.candidates import close_blob_service_client
+    await get_supabase_client().aclose()
+    await close_ai_client()
+    await close_blob_service_client()
+
+
+# orjson serializes response bodies straight to bytes, several times faster than stdlib json
+app = FastAPI(
+    title="Perfect Fit Admin API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 # CORS Configuration
 # Note: When allow_credentials=True, "*" is not allowed for allow_origins.
@@ -71,37 +93,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
 
 # Logging Middleware
-@app.middleware("http")
-async def logging_middleware(request: Request, call_next):
+# Plain ASGI middleware rather than @app.middleware("http"): the decorator form
+# runs through BaseHTTPMiddleware, which adds an extra task and response
+# wrapping to every request.
+class RequestLoggingMiddleware:
     """Log all HTTP requests and responses with timing."""
-    start_time = time.time()
-    
-    # Get client IP
-    client_ip = request.client.host if request.client else "unknown"
-    
-    # Log incoming request
-    log_request(request.method, str(request.url.path), client_ip)
-    
-    try:
-        response = await call_next(request)
-        
-        # Calculate duration
-        duration_ms = (time.time() - start_time) * 1000
-        
-        # Log response
-        log_response(request.method, str(request.url.path), response.status_code, duration_ms)
-        
-        return response
-        
-    except Exception as e:
-        # Log error and re-raise
-        duration_ms = (time.time() - start_time) * 1000
-        log_error(e, context=f"{request.method} {request.url.path}")
-        raise
+
+    # Liveness probes hit these constantly; their handlers log on their own
+    SKIP_PATHS = frozenset({"/"})
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method, path = scope["method"], scope["path"]
+
+        # Get client IP
+        client = scope.get("client")
+        log_request(method, path, client[0] if client else "unknown")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                log_response(method, path, message["status"], duration_ms)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            # Log error and re-raise
+            log_error(e, context=f"{method} {path}")
+            raise
+
+
+app.add_middleware(RequestLoggingMiddleware)
 
 
 # Global Exception Handler
@@ -137,9 +172,9 @@ def read_root():
 @app.get("/debug-health")
 async def debug_health():
     """Diagnostic endpoint to check env vars and db connection."""
-    import pkg_resources
+    from importlib.metadata import version, PackageNotFoundError
     import os
-    from dependencies import get_supabase
+    from dependencies import get_supabase_client
     
     results = {
         "env_vars": {
@@ -154,16 +189,16 @@ async def debug_health():
     # Check versions
     for pkg in ["supabase", "postgrest", "gotrue", "fastapi"]:
         try:
-            results["packages"][pkg] = pkg_resources.get_distribution(pkg).version
-        except Exception as e:
+            results["packages"][pkg] = version(pkg)
+        except PackageNotFoundError as e:
             results["packages"][pkg] = f"Not found: {str(e)}"
 
     # Test DB Connection
     try:
-        supabase = get_supabase()
-        # Try a simple count query on 'profiles' - simplified to reduce errors
-        # Note: relying on the custom client structure from dependencies.py
-        response = await supabase.table("profiles").select("*", count="exact", head=True).limit(1).execute()
+        supabase = get_supabase_client()
+        # Count query on 'profiles'; the pinned postgrest has no head=True, so
+        # fetch at most one row and read the total from response.count
+        response = await supabase.table("profiles").select("id", count="exact").limit(1).execute()
         results["db_connection"] = f"SUCCESS: Found {response.count} profiles"
     except Exception as e:
         results["db_connection"] = f"FAILED: {str(e)}"
@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
+import asyncio
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
 from pydantic import BaseModel
-from datetime import datetime, timedelta
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
-import os
+from cachetools import TTLCache
 
-from dependencies import get_supabase, verify_admin
+from dependencies import get_supabase, verify_admin, invalidate_cached_role
 from core.logging import api_logger, db_logger, error_logger, log_error
+from core.storage import sign_blob_url, sign_blob_urls
 
 router = APIRouter()
 
-# Azure Blob Storage Config
-AZURE_CONNECTION_STRING = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
-CONTAINER_NAME = os.environ.get("AZURE_STORAGE_CONTAINER_NAME")
+# Signed audio URLs by response id. SAS tokens are issued for 1 hour, so a
+# 50 minute TTL always hands out URLs with at least 10 minutes left.
+AUDIO_SAS_CACHE_TTL_SECONDS = 50 * 60
+_audio_sas_cache: TTLCache = TTLCache(maxsize=2000, ttl=AUDIO_SAS_CACHE_TTL_SECONDS)
+
+# Dashboard stats change on the order of minutes; polls within this window
+# reuse the last serialized result (and its ETag) without touching the DB.
+STATS_CACHE_TTL_SECONDS = 30
+_stats_cache: TTLCache = TTLCache(maxsize=1, ttl=STATS_CACHE_TTL_SECONDS)
 
 # --- Pydantic Models ---
 
@@ -46,58 +53,41 @@ class AssessmentDetail(BaseModel):
     scores: Optional[dict]
     responses: List[dict]
 
+# Roles an admin can assign; anything else is rejected while parsing the body
+UserRole = Literal['candidate', 'employee', 'hr', 'recruiter', 'admin']
+
 class RoleUpdate(BaseModel):
-    role: str
+    role: UserRole
 
 # --- Endpoints ---
 
 @router.get("/stats", response_model=UserStats)
-async def get_stats(admin = Depends(verify_admin), supabase = Depends(get_supabase)):
+async def get_stats(request: Request, admin = Depends(verify_admin), supabase = Depends(get_supabase)):
     api_logger.info("Fetching admin stats")
     
-    # 1. Count Candidates
-    candidates_count = (await supabase.table("profiles").select("*", count="exact").eq("role", "candidate").execute()).count
-    
-    # 2. Count Employees
-    employees_count = (await supabase.table("profiles").select("*", count="exact").eq("role", "employee").execute()).count
-    
-    # 3. Total Assessments
-    assessments_count = (await supabase.table("assessments").select("*", count="exact").execute()).count
-    
-    # 4. Assessments Today
-    today = datetime.now().strftime("%Y-%m-%d")
-    assessments_today_count = (await supabase.table("assessments").select("*", count="exact").gte("created_at", today).execute()).count
-    
-    # 5. Average Score & Distribution
-    scores_response = await supabase.table("assessment_scores").select("total_score").execute()
-    scores = [s['total_score'] for s in scores_response.data if s['total_score'] is not None]
-    
-    avg_score = sum(scores) / len(scores) if scores else 0.0
+    cached = _stats_cache.get("stats")
+    if cached is None:
+        # All counts, the average and the histogram are aggregated in Postgres
+        # (see migrations/005_admin_stats_rpc.sql) in a single round trip
+        stats = (await supabase.rpc("get_admin_stats").execute()).data or {}
 
-    # Calculate Distribution
-    distribution = {
-        "0-20%": 0,
-        "20-40%": 0,
-        "40-60%": 0,
-        "60-80%": 0,
-        "80-100%": 0
-    }
-    
-    for score in scores:
-        if score <= 20: distribution["0-20%"] += 1
-        elif score <= 40: distribution["20-40%"] += 1
-        elif score <= 60: distribution["40-60%"] += 1
-        elif score <= 80: distribution["60-80%"] += 1
-        else: distribution["80-100%"] += 1
+        body = UserStats(
+            total_candidates=stats.get("total_candidates") or 0,
+            total_employees=stats.get("total_employees") or 0,
+            total_assessments=stats.get("total_assessments") or 0,
+            assessments_today=stats.get("assessments_today") or 0,
+            average_score=round(float(stats.get("average_score") or 0.0), 1),
+            score_distribution=stats.get("score_distribution") or []
+        ).model_dump_json().encode()
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        cached = _stats_cache["stats"] = (body, etag)
 
-    return UserStats(
-        total_candidates=candidates_count or 0,
-        total_employees=employees_count or 0,
-        total_assessments=assessments_count or 0,
-        assessments_today=assessments_today_count or 0,
-        average_score=round(avg_score, 1),
-        score_distribution=[{"name": k, "count": v} for k, v in distribution.items()]
-    )
+    body, etag = cached
+    # Authenticated data: cacheable by the admin's browser only
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={STATS_CACHE_TTL_SECONDS}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/users", response_model=dict)
 async def get_users(
@@ -106,8 +96,6 @@ async def get_users(
     search: Optional[str] = None,
     supabase = Depends(get_supabase)
 ):
-    from core.storage import sign_blob_url
-    
     start = (page - 1) * limit
     end = start + limit - 1
     
@@ -120,13 +108,12 @@ async def get_users(
     query = query.order("created_at", desc=True).range(start, end)
     result = await query.execute()
     
-    # Sign avatar URLs
-    users = []
-    if result.data:
-        for user in result.data:
-            if user.get('avatar_url'):
-                user['avatar_url'] = sign_blob_url(user['avatar_url'])
-            users.append(user)
+    # Sign avatar URLs in one batch, off the event loop
+    users = result.data or []
+    signed_avatars = await asyncio.to_thread(sign_blob_urls, [user.get('avatar_url') for user in users])
+    for user, avatar_url in zip(users, signed_avatars):
+        if avatar_url:
+            user['avatar_url'] = avatar_url
     
     return {
         "data": users,
@@ -137,50 +124,26 @@ async def get_users(
 
 @router.patch("/users/{user_id}/role")
 async def update_user_role(user_id: str, role_update: RoleUpdate, supabase = Depends(get_supabase)):
-    valid_roles = ['candidate', 'employee', 'hr', 'recruiter', 'admin']
-    if role_update.role not in valid_roles:
-        raise HTTPException(status_code=400, detail="Invalid role")
-        
     result = await supabase.table("profiles").update({"role": role_update.role}).eq("id", user_id).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="User not found")
-        
+    
+    invalidate_cached_role(user_id)
     return result.data[0]
 
 @router.get("/assessments", response_model=List[AssessmentSummary])
 async def get_assessments(limit: int = 20, supabase = Depends(get_supabase)):
     api_logger.info(f"Fetching assessments (limit={limit})")
-    # Fetch assessments with user info
-    # Supabase join: assessments(..., profiles(email, full_name), assessment_scores(overall_score))
     
     try:
-        response = await supabase.table("assessments").select(
-            "id, status, created_at, user_id, profiles(email, full_name), assessment_scores(total_score)"
-        ).order("created_at", desc=True).limit(limit).execute()
+        # Rows come back already flat (see migrations/011_assessment_summaries_view.sql)
+        response = await supabase.table("v_assessment_summaries").select("*").order("created_at", desc=True).limit(limit).execute()
         
         db_logger.debug(f"Fetched {len(response.data)} assessments from database")
     
-        assessments = []
-        for item in response.data:
-            profile = item.get('profiles') or {}
-            scores_data = item.get('assessment_scores')
-            
-            total_score = None
-            if isinstance(scores_data, list) and len(scores_data) > 0:
-                total_score = scores_data[0].get('total_score')
-            elif isinstance(scores_data, dict):
-                total_score = scores_data.get('total_score')
-
-            assessments.append(AssessmentSummary(
-                id=item['id'],
-                user_id=item['user_id'],
-                user_name=profile.get('full_name'),
-                user_email=profile.get('email', 'Unknown'),
-                status=item['status'],
-                overall_score=total_score,
-                created_at=item['created_at']
-            ))
+        # The view's columns match AssessmentSummary; response_model validates them once
+        assessments = response.data or []
         
         api_logger.info(f"Returning {len(assessments)} assessments")
         return assessments
@@ -192,29 +155,25 @@ async def get_assessments(limit: int = 20, supabase = Depends(get_supabase)):
 
 @router.get("/assessments/{id}", response_model=AssessmentDetail)
 async def get_assessment_detail(id: str, supabase = Depends(get_supabase)):
-    # 1. Fetch Assessment & User Profile
+    # Assessment, profile, scores and responses in one round trip via resource embedding
     assessment_res = await supabase.table("assessments").select(
-        "*, profiles(*)"
-    ).eq("id", id).single().execute()
+        "*, profiles(*), assessment_scores(*), assessment_responses(*)"
+    ).eq("id", id).order("created_at", foreign_table="assessment_responses").limit(1).execute()
     
     if not assessment_res.data:
         raise HTTPException(status_code=404, detail="Assessment not found")
         
-    assessment = assessment_res.data
+    assessment = assessment_res.data[0]
     profile = assessment.get('profiles')
     
     # Sign profile pic if exists
     if profile and profile.get('avatar_url'):
-        from core.storage import sign_blob_url
         profile['avatar_url'] = sign_blob_url(profile['avatar_url'])
     
-    # 2. Fetch Scores
-    scores_res = await supabase.table("assessment_scores").select("*").eq("assessment_id", id).maybe_single().execute()
-    scores = scores_res.data if scores_res and scores_res.data else None
-    
-    # 3. Fetch Responses
-    responses_res = await supabase.table("assessment_responses").select("*").eq("assessment_id", id).order("created_at").execute()
-    responses = responses_res.data # Contains audio_url / transcript / feedback
+    scores = assessment.get('assessment_scores') or None
+    if isinstance(scores, list):
+        scores = scores[0] if scores else None
+    responses = assessment.get('assessment_responses') or [] # Contains audio_url / transcript / feedback
     
     return AssessmentDetail(
         id=id,
@@ -228,10 +187,12 @@ async def get_audio_sas(id: str, response_id: str, supabase = Depends(get_supaba
     """
     Generate a fresh SAS token for the audio file associated with a specific response.
     """
-    from core.storage import sign_blob_url
-    
     api_logger.info(f"Fetching audio SAS for assessment={id}, response={response_id}")
     
+    cached = _audio_sas_cache.get(response_id)
+    if cached is not None:
+        return cached
+    
     # 1. Get the response record to find the audio path
     try:
         response_record = await supabase.table("assessment_responses").select("audio_url, section").eq("id", response_id).single().execute()
@@ -249,7 +210,9 @@ async def get_audio_sas(id: str, response_id: str, supabase = Depends(get_supaba
     sas_url = sign_blob_url(saved_url)
     
     api_logger.info(f"Generated SAS URL for {section}")
-    return {"audio_url": sas_url, "section": section}
+    result = {"audio_url": sas_url, "section": section}
+    _audio_sas_cache[response_id] = result
+    return result
 
 
 @router.delete("/users/{user_id}", status_code=204)
@@ -275,6 +238,7 @@ async def delete_user(user_id: str, supabase = Depends(get_supabase)):
     # Let's delete from 'profiles' table.
     try:
         result = await supabase.table("profiles").delete().eq("id", user_id).execute()
+        invalidate_cached_role(user_id)
         if not result.data:
             # It might be already deleted or not found.
             pass
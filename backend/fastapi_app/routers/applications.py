@@ -6,17 +6,23 @@ Endpoints:
 - GET /applications/me - Get current user's applications
 - GET /applications - Get all applications (Admin/HR)
 - PUT /applications/{application_id}/status - Update application status (Admin/HR)
+- POST /applications/{application_id}/technical-assessment/submit - Submit answers (scored in background)
+- GET /applications/{application_id}/technical-assessment/status - Scoring progress
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from typing import List, Optional
-from pydantic import BaseModel, Field
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, BackgroundTasks
+from fastapi.responses import ORJSONResponse
+from typing import List, Literal, Optional
+from pydantic import BaseModel
+from postgrest.exceptions import APIError
+from datetime import datetime, timezone
 import asyncio
+import hashlib
+import orjson
 
-from dependencies import get_supabase, CustomSupabaseClient, get_user_with_role, verify_hr_or_admin
+from dependencies import get_supabase, get_supabase_client, CustomSupabaseClient, get_user_with_role, verify_hr_or_admin
 from core.logging import api_logger, db_logger, log_error
-from agents.scoring_agent import evaluate_answer
+from agents.scoring_agent import iter_answer_evaluations
 
 router = APIRouter()
 
@@ -28,8 +34,11 @@ class ApplicationCreate(BaseModel):
     cover_letter: Optional[str] = None
     # We can pull other details from candidate profile automatically
 
+# Statuses HR/Admin can move an application to; anything else is rejected while parsing the body
+ApplicationStatus = Literal["reviewing", "shortlisted", "rejected", "hired"]
+
 class ApplicationStatusUpdate(BaseModel):
-    status: str = Field(..., pattern="^(reviewing|shortlisted|rejected|hired)$")
+    status: ApplicationStatus
     feedback: Optional[str] = None
 
 class ApplicationResponse(BaseModel):
@@ -57,11 +66,16 @@ class AssessmentResponse(BaseModel):
     message: str
     scored_count: int
 
+class AssessmentStatus(BaseModel):
+    total: int
+    scored: int
+    completed: bool
+
 # ============================================
 # Endpoints
 # ============================================
 
-@router.post("/{app_id}/technical-assessment/submit", status_code=status.HTTP_200_OK)
+@router.post("/{app_id}/technical-assessment/submit", status_code=status.HTTP_202_ACCEPTED)
 async def submit_technical_assessment(
     app_id: str,
     submission: AssessmentSubmission,
@@ -71,26 +85,30 @@ async def submit_technical_assessment(
 ):
     """
     Submit technical assessment answers.
-    Triggers AI Agent to evaluate each answer and score it.
+    Stores them unscored and returns 202; the AI Agent scores them in the
+    background (poll GET /{app_id}/technical-assessment/status).
     """
-    api_logger.info(f"User {user['id']} submitting assessment for application: {app_id}")
+    api_logger.info("User %s submitting assessment for application: %s", user["id"], app_id)
 
     try:
-        # 1. Verify application belongs to user
-        app = await supabase.table("job_applications").select("id, job_id, applicant_id").eq("id", app_id).single().execute()
+        # 1+2. Application row and the job's questions in one round trip
+        # (technical_assessments is embedded through job_roles; the questions
+        # need the application's job_id, so the two reads can't be gathered)
+        app = await supabase.table("job_applications").select(
+            "id, job_id, applicant_id, job_roles(technical_assessments(id, question, desired_answer))"
+        ).eq("id", app_id).limit(1).execute()
         
         if not app.data:
             raise HTTPException(status_code=404, detail="Application not found")
+
+        application = app.data[0]
             
-        if app.data["applicant_id"] != user["id"]:
+        if application["applicant_id"] != user["id"]:
             # Basic security check
             raise HTTPException(status_code=403, detail="Not authorized to submit for this application")
 
-        job_id = app.data["job_id"]
-
-        # 2. Fetch all questions and desired answers for the job
-        questions_resp = await supabase.table("technical_assessments").select("id, question, desired_answer").eq("job_id", job_id).execute()
-        questions_map = {q["id"]: q for q in questions_resp.data} if questions_resp.data else {}
+        questions = (application.get("job_roles") or {}).get("technical_assessments") or []
+        questions_map = {q["id"]: q for q in questions}
 
         if not questions_map:
              raise HTTPException(status_code=400, detail="No technical questions found for this job")
@@ -115,8 +133,8 @@ async def submit_technical_assessment(
             ).execute()
 
         # 4. Trigger Background Scoring
-        # Note: run_ai_scoring creates its own fresh Supabase client internally
-        # to avoid issues with request-scoped clients closing after response
+        # run_ai_scoring uses the process-wide client (get_supabase_client),
+        # which stays open after this response is sent
         background_tasks.add_task(
             run_ai_scoring,
             app_id,
@@ -128,91 +146,127 @@ async def submit_technical_assessment(
             message="Assessment submitted. AI analysis is running in the background.",
             scored_count=len(unscored_responses)
         )
+    except HTTPException:
+        raise
     except Exception as e:
-        api_logger.error(f"Error submitting assessment: {str(e)}")
+        api_logger.error("Error submitting assessment: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-from fastapi import BackgroundTasks
+@router.get("/{app_id}/technical-assessment/status", response_model=AssessmentStatus)
+async def get_technical_assessment_status(
+    app_id: str,
+    user: dict = Depends(get_user_with_role),
+    supabase: CustomSupabaseClient = Depends(get_supabase)
+):
+    """Scoring progress of a submitted technical assessment."""
+    try:
+        app, responses = await asyncio.gather(
+            supabase.table("job_applications").select("applicant_id").eq("id", app_id).limit(1).execute(),
+            supabase.table("technical_assessment_responses").select("ai_score").eq("application_id", app_id).execute(),
+        )
 
-async def run_ai_scoring(app_id: str, answers: List[QuestionAnswer], questions_map: dict):
-    """
-    Background task to score answers.
-    """
-    # Create a fresh service role client if not passed or to ensure persistence
-    # Re-import to avoid circular dependency if needed, or use the one from dependencies
-    from dependencies import CustomSupabaseClient
-    import os
-    
-    # We need a fresh client because the request scoped one might be closed?
-    # Actually fastapi dependency usually works if used within request, but background tasks run after response.
-    # Better safe: create new client.
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-    supabase = CustomSupabaseClient(url, key)
-    
-    api_logger.info(f"Starting background AI scoring for app {app_id}")
-    
-    scored_updates = []
-    
-    async def process_single_answer(qa: QuestionAnswer):
-        q_data = questions_map.get(qa.question_id)
-        if not q_data: return None
-
-        try:
-            # Run AI Evaluation
-            evaluation = await evaluate_answer(
-                question=q_data["question"],
-                desired_answer=q_data["desired_answer"],
-                candidate_answer=qa.answer
-            )
-            
-            return {
+        if not app.data:
+            raise HTTPException(status_code=404, detail="Application not found")
+
+        if app.data[0]["applicant_id"] != user["id"] and user["role"] not in ("admin", "hr"):
+            raise HTTPException(status_code=403, detail="Not authorized to view this application")
+
+        rows = responses.data or []
+        scored = sum(1 for r in rows if r.get("ai_score") is not None)
+        return AssessmentStatus(total=len(rows), scored=scored, completed=bool(rows) and scored == len(rows))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(e, context="get_technical_assessment_status")
+        raise HTTPException(status_code=500, detail="Failed to fetch assessment status")
+
+async def _store_evaluations(supabase: CustomSupabaseClient, app_id: str, scored: list):
+    """Upsert (QuestionAnswer, evaluation) pairs into technical_assessment_responses."""
+    if not scored:
+        return
+    await supabase.table("technical_assessment_responses").upsert(
+        [
+            {
                 "application_id": app_id,
                 "question_id": qa.question_id,
+                "answer": qa.answer,
                 "ai_score": evaluation.get("score"),
                 "ai_reasoning": evaluation.get("reasoning")
             }
-        except Exception as e:
-            log_error(e, context=f"bg_process_answer: {qa.question_id}")
-            return {
-                "application_id": app_id,
-                "question_id": qa.question_id,
-                 "ai_score": 0,
-                "ai_reasoning": f"Analysis failed: {str(e)}"
-            }
+            for qa, evaluation in scored
+        ],
+        on_conflict="application_id,question_id"
+    ).execute()
 
-    tasks = [process_single_answer(qa) for qa in answers]
-    results = await asyncio.gather(*tasks)
+async def run_ai_scoring(app_id: str, answers: List[QuestionAnswer], questions_map: dict):
+    """
+    Background task to score answers.
+    """
+    # The shared client lives for the whole process (closed in the app lifespan),
+    # so it is still open after the response has been sent.
+    supabase = get_supabase_client()
     
-    valid_updates = [r for r in results if r]
+    api_logger.info("Starting background AI scoring for app %s", app_id)
     
-    if valid_updates:
-        # Upsert each or bulk? Bulk upsert works for multiple rows.
-        # We only need to update score/reasoning.
-        # But upsert requires all primary keys/constraints.
-        # We have application_id, question_id.
-        # We need to make sure we don't overwrite "answer" with null if we didn't include it.
-        # The 'valid_updates' above lacks 'answer'.
-        # So we should probably include 'answer' to be safe or use specific update logic.
-        # Bulk update in supabase usually requires all columns or it might set missing ones to null?
-        # No, 'upsert' updates provided columns. But better to include 'answer' just in case.
-        
-        # Let's just include "answer" from the original input to be safe and simple.
-        # Map original answers
-        answers_map = {a.question_id: a.answer for a in answers}
-        
-        for r in valid_updates:
-            r["answer"] = answers_map.get(r["question_id"])
-            
-        await supabase.table("technical_assessment_responses").upsert(
-            valid_updates, 
-            on_conflict="application_id,question_id"
-        ).execute()
-        
-    api_logger.info(f"Background scoring completed for app {app_id}")
+    # One batched model call per assessment instead of one call per answer
+    scorable = [qa for qa in answers if qa.question_id in questions_map]
+    items = [
+        {
+            "question": questions_map[qa.question_id]["question"],
+            "desired_answer": questions_map[qa.question_id]["desired_answer"],
+            "candidate_answer": qa.answer,
+        }
+        for qa in scorable
+    ]
+
+    # Each group is upserted as soon as it is scored, in a task that overlaps
+    # the next model call; the status endpoint shows partial progress.
+    # "answer" is included so the upsert never overwrites it with null.
+    writes = []
+    scored_indices = set()
+    try:
+        async for group in iter_answer_evaluations(items):
+            scored_indices.update(i for i, _ in group)
+            writes.append(asyncio.create_task(
+                _store_evaluations(supabase, app_id, [(scorable[i], evaluation) for i, evaluation in group])
+            ))
+    except Exception as e:
+        log_error(e, context=f"bg_process_answers: {app_id}")
+        # Whatever is still unscored gets a failure row instead of staying pending
+        writes.append(asyncio.create_task(_store_evaluations(supabase, app_id, [
+            (qa, {"score": 0, "reasoning": f"Analysis failed: {str(e)}"})
+            for i, qa in enumerate(scorable)
+            if i not in scored_indices
+        ])))
+
+    for result in await asyncio.gather(*writes, return_exceptions=True):
+        if isinstance(result, Exception):
+            log_error(result, context=f"bg_store_answers: {app_id}")
+
+    api_logger.info("Background scoring completed for app %s", app_id)
 
 
 
+# List endpoints return every row unless the caller asks for a page with
+# ?limit= (the frontend doesn't page yet); the body stays a plain array and
+# the full row count is sent in the X-Total-Count header
+MAX_PAGE_SIZE = 200
+
+def _paginate(query, page: int, limit: Optional[int]):
+    """Apply ?page=&limit= to a query; without a limit the query is left unpaged."""
+    if limit is None:
+        return query
+    start = (page - 1) * limit
+    return query.range(start, start + limit - 1)
+
+# SQLSTATEs raised by the apply_for_job SQL function
+APPLY_ERROR_STATUS = {
+    "P0002": status.HTTP_404_NOT_FOUND,   # job not found
+    "23514": status.HTTP_400_BAD_REQUEST, # job not accepting applications
+    "23505": status.HTTP_409_CONFLICT,    # already applied
+}
+
 @router.post("/{job_id}", status_code=status.HTTP_201_CREATED)
 async def apply_for_job(
     job_id: str,
@@ -221,96 +275,59 @@ async def apply_for_job(
     supabase: CustomSupabaseClient = Depends(get_supabase)
 ):
     """Submit an application for a job."""
-    api_logger.info(f"User {user['id']} applying for job: {job_id}")
+    api_logger.info("User %s applying for job: %s", user["id"], job_id)
     
     try:
-        # 1. Verify job exists and is open
-        job = await supabase.table("job_roles").select("status, is_open, title").eq("id", job_id).single().execute()
-        
-        if not job.data:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        if job.data["status"] != "approved" or not job.data["is_open"]:
-            raise HTTPException(status_code=400, detail="Job is not accepting applications")
-        
-        # 2. Check for existing application
-        existing = await supabase.table("job_applications").select("id").eq("job_id", job_id).eq("applicant_id", user["id"]).execute()
-        
-        if existing.data:
-            raise HTTPException(status_code=409, detail="You have already applied for this job")
-            
-        # 3. Fetch candidate profile to auto-populate fields
-        profile = await supabase.table("candidate_profiles").select("*").eq("id", user["id"]).single().execute()
-        p_data = profile.data or {}
-        
-        # 4. Insert application
-        app_data = {
-            "job_id": job_id,
-            "applicant_id": user["id"],
-            "status": "submitted",
-            "cover_letter": application.cover_letter,
-            # Auto-populate from profile
-            "resume_url": p_data.get("resume_url"),
-            "phone": p_data.get("phone"),
-            "linkedin_url": p_data.get("linkedin_url"),
-            "created_at": datetime.utcnow().isoformat()
-        }
-        
-        result = await supabase.table("job_applications").insert(app_data).execute()
+        # Job validation, duplicate check, profile auto-population and insert
+        # all run inside the apply_for_job SQL function (one round trip)
+        result = await supabase.rpc("apply_for_job", {
+            "p_job_id": job_id,
+            "p_applicant_id": user["id"],
+            "p_cover_letter": application.cover_letter
+        }).execute()
         
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to submit application")
             
-        return result.data[0]
+        return result.data
 
     except HTTPException:
         raise
+    except APIError as e:
+        status_code = APPLY_ERROR_STATUS.get(e.code)
+        if status_code is None:
+            log_error(e, context="apply_for_job")
+            raise HTTPException(status_code=500, detail="Application submission failed")
+        raise HTTPException(status_code=status_code, detail=e.message)
     except Exception as e:
         log_error(e, context="apply_for_job")
         raise HTTPException(status_code=500, detail="Application submission failed")
 
 @router.get("/me")
 async def get_my_applications(
+    request: Request,
+    page: int = Query(1, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     user: dict = Depends(get_user_with_role),
     supabase: CustomSupabaseClient = Depends(get_supabase)
 ):
-    """Get applications submitted by the current user."""
-    api_logger.info(f"Fetching applications for user: {user['id']}")
+    """Get applications submitted by the current user (optionally paginated, total in X-Total-Count)."""
+    api_logger.info("Fetching applications for user: %s", user["id"])
     
     try:
-        # Fetch applications with Job details
-        # Supabase-py default postgrest client allows joining? 
-        # For simplicity, we might just fetch apps and enrich or use a view.
-        # Let's try explicit select for enrichment if relation exists, or just fetch basic first.
-        
-        # Assuming foreign keys are set up, we can do: select(*, job_roles(title))
-        result = await supabase.table("job_applications").select("*, job_roles(title)").eq("applicant_id", user["id"]).order("created_at", desc=True).execute()
-        
-        # Custom logic to check for technical assessment completion
-        # We need to fetch technical_assessment_responses count for each app
-        # Optimization: fetch all relevant application IDs and check existence in responses table
-        apps = []
-        if result.data:
-            app_ids = [item["id"] for item in result.data]
-            
-            # Get list of app IDs that have responses
-            responses_query = await supabase.table("technical_assessment_responses").select("application_id").in_("application_id", app_ids).execute()
-            completed_app_ids = set()
-            if responses_query.data:
-                completed_app_ids = {r["application_id"] for r in responses_query.data}
-
-            for item in result.data:
-                 # Flatten job_roles.title into job_title
-                 job = item.get("job_roles")
-                 if job and isinstance(job, dict):
-                     item["job_title"] = job.get("title")
-                 elif job and isinstance(job, list) and len(job) > 0: # handle potential list return
-                      item["job_title"] = job[0].get("title")
-                 
-                 item["technical_assessment_completed"] = item["id"] in completed_app_ids
-                 apps.append(item)
-                 
-        return apps
+        # Job title and assessment completion are computed in the view
+        # (see migrations/012_applications_with_completion_view.sql)
+        query = supabase.table("v_applications_with_completion").select("*", count="exact").eq("applicant_id", user["id"]).order("created_at", desc=True)
+        result = await _paginate(query, page, limit).execute()
+
+        # Clients poll this list; unchanged pages are answered with 304 and no body
+        body = orjson.dumps(result.data or [])
+        total = str(result.count or 0)
+        etag = f'"{hashlib.blake2b(body + total.encode(), digest_size=16).hexdigest()}"'
+        headers = {"X-Total-Count": total, "ETag": etag, "Cache-Control": "private, must-revalidate"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
 
     except Exception as e:
         log_error(e, context="get_my_applications")
@@ -318,63 +335,21 @@ async def get_my_applications(
 
 @router.get("")
 async def list_all_applications(
+    page: int = Query(1, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     user: dict = Depends(verify_hr_or_admin),
     supabase: CustomSupabaseClient = Depends(get_supabase)
 ):
-    """List all applications (HR/Admin only)."""
-    api_logger.info(f"Listing all applications for admin: {user['id']}")
+    """List all applications (HR/Admin only, optionally paginated, total in X-Total-Count)."""
+    api_logger.info("Listing all applications for admin: %s", user["id"])
     
     try:
-        # Fetch applications with Job details
-        result = await supabase.table("job_applications").select("*, job_roles(title)").order("created_at", desc=True).execute()
-
-        apps = []
-        if not result.data:
-            return apps
-
-        # Collect all applicant IDs to fetch profiles in bulk (filter invalid/empty)
-        applicant_ids = [
-            item.get("applicant_id")
-            for item in result.data
-            if item.get("applicant_id")
-        ]
-
-        # Fetch profiles (best-effort: don't fail the whole request if this errors)
-        profiles_map = {}
-        if applicant_ids:
-            try:
-                p_result = await supabase.table("candidate_profiles").select("id, full_name, email, resume_url, linkedin_url").in_("id", applicant_ids).execute()
-                if p_result.data:
-                    for p in p_result.data:
-                        profiles_map[p["id"]] = p
-            except Exception as e:
-                log_error(e, context="list_all_applications:profile_lookup")
-
-        for item in result.data:
-            # Enrich with job title
-            job = item.get("job_roles")
-            if job and isinstance(job, dict):
-                item["job_title"] = job.get("title")
-            elif job and isinstance(job, list) and len(job) > 0:
-                item["job_title"] = job[0].get("title")
-
-            # Enrich with candidate details
-            profile = profiles_map.get(item.get("applicant_id"))
-            if profile:
-                item["candidate_name"] = profile.get("full_name")
-                item["candidate_email"] = profile.get("email")
-                # Fallback to profile data if application data is missing
-                if not item.get("resume_url"):
-                    item["resume_url"] = profile.get("resume_url")
-                if not item.get("linkedin_url"):
-                    item["linkedin_url"] = profile.get("linkedin_url")
-            else:
-                item["candidate_name"] = "Unknown"
-                item["candidate_email"] = ""
-
-            apps.append(item)
-
-        return apps
+        # Job title and candidate details are joined in the view
+        # (see migrations/009_applications_enriched_view.sql)
+        query = supabase.table("v_applications_enriched").select("*", count="exact").order("created_at", desc=True)
+        result = await _paginate(query, page, limit).execute()
+        # Rows come straight from PostgREST; return them without another encoding pass
+        return ORJSONResponse(result.data or [], headers={"X-Total-Count": str(result.count or 0)})
 
     except Exception as e:
         # log_error(e, context="list_all_applications") # Assuming log_error is available or imported. Using print/logger if not sure.
@@ -390,12 +365,12 @@ async def update_application_status(
     supabase: CustomSupabaseClient = Depends(get_supabase)
 ):
     """Update application status (e.g. shortlist, reject)."""
-    api_logger.info(f"Updating application {app_id} status to {update.status} by {user['id']}")
+    api_logger.info("Updating application %s status to %s by %s", app_id, update.status, user["id"])
     
     try:
         data = {
             "status": update.status,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": datetime.now(timezone.utc).isoformat()
         }
         
         # Add feedback if provided
@@ -421,7 +396,7 @@ async def delete_application(
     supabase: CustomSupabaseClient = Depends(get_supabase)
 ):
     """Delete an application."""
-    api_logger.info(f"Deleting application {app_id} by {user['id']}")
+    api_logger.info("Deleting application %s by %s", app_id, user["id"])
     
     try:
         result = await supabase.table("job_applications").delete().eq("id", app_id).execute()
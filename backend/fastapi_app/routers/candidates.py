@@ -8,11 +8,12 @@ Endpoints:
 - POST /candidates/upload/picture - Upload profile picture to Azure Blob Storage
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks
 from typing import Optional, Dict, Any
 from pydantic import BaseModel, Field, HttpUrl
 import os
 import uuid
+import functools
 from azure.storage.blob.aio import BlobServiceClient
 from azure.core.exceptions import ResourceExistsError
 
@@ -61,11 +62,30 @@ class CandidateProfileResponse(BaseModel):
 # Azure Blob Storage Helper
 # ============================================
 
+UPLOAD_BLOCK_SIZE = 4 * 1024 * 1024
+UPLOAD_MAX_CONCURRENCY = 4
+
+@functools.lru_cache(maxsize=1)
 def get_blob_service_client():
+    """Return a shared async BlobServiceClient so its connection pool is reused."""
     connect_str = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
     if not connect_str:
         raise ValueError("AZURE_STORAGE_CONNECTION_STRING not set")
-    return BlobServiceClient.from_connection_string(connect_str)
+    # Uploads above one block are sent as staged blocks, never buffered whole
+    return BlobServiceClient.from_connection_string(
+        connect_str,
+        max_single_put_size=UPLOAD_BLOCK_SIZE,
+        max_block_size=UPLOAD_BLOCK_SIZE
+    )
+
+async def close_blob_service_client():
+    """Close the shared client on app shutdown (no-op if it was never created)."""
+    if get_blob_service_client.cache_info().currsize:
+        await get_blob_service_client().close()
+        get_blob_service_client.cache_clear()
+
+# Containers already created (or found to exist) by this process
+_ensured_containers = set()
 
 from core.storage import sign_blob_url
 
@@ -91,12 +111,10 @@ async def delete_blob_from_url(blob_url: str):
         if '?' in blob_name:
             blob_name = blob_name.split('?')[0]
 
-        blob_service_client = get_blob_service_client()
-        async with blob_service_client:
-            container_client = blob_service_client.get_container_client(container_name)
-            blob_client = container_client.get_blob_client(blob_name)
-            await blob_client.delete_blob()
-            api_logger.info(f"Deleted old blob: {blob_name}")
+        container_client = get_blob_service_client().get_container_client(container_name)
+        blob_client = container_client.get_blob_client(blob_name)
+        await blob_client.delete_blob()
+        api_logger.info(f"Deleted old blob: {blob_name}")
             
     except Exception as e:
         # Log but don't fail the request if deletion fails
@@ -108,22 +126,29 @@ async def upload_to_azure_blob(file: UploadFile, container_name: str) -> str:
     filename = f"{uuid.uuid4()}-{file.filename}"
     
     try:
-        blob_service_client = get_blob_service_client()
-        async with blob_service_client:
-            container_client = blob_service_client.get_container_client(container_name)
-            
+        container_client = get_blob_service_client().get_container_client(container_name)
+        
+        if container_name not in _ensured_containers:
             try:
                 await container_client.create_container()
             except ResourceExistsError:
                 pass
             except Exception:
                 pass
+            _ensured_containers.add(container_name)
 
-            blob_client = container_client.get_blob_client(filename)
-            file_content = await file.read()
-            await blob_client.upload_blob(file_content, overwrite=True)
-            
-            return blob_client.url
+        blob_client = container_client.get_blob_client(filename)
+        # UploadFile.read() hops to a worker thread once the spool rolls to disk;
+        # handing file.file to the aio client would read it on the event loop
+        await file.seek(0)
+        file_content = await file.read()
+        await blob_client.upload_blob(
+            file_content,
+            overwrite=True,
+            max_concurrency=UPLOAD_MAX_CONCURRENCY
+        )
+        
+        return blob_client.url
             
     except Exception as e:
         log_error(e, context="upload_to_azure_blob")
@@ -134,6 +159,32 @@ async def upload_to_azure_blob(file: UploadFile, container_name: str) -> str:
     finally:
         await file.seek(0)
 
+async def swap_profile_asset(
+    supabase: CustomSupabaseClient,
+    user: dict,
+    field: str,
+    file_url: str,
+    background_tasks: BackgroundTasks
+) -> None:
+    """
+    Point the profile's resume_url / profile_pic_url at a freshly uploaded blob
+    (one RPC, see migrations/013_swap_profile_asset_rpc.sql) and delete the
+    replaced blob after the response. If the swap fails the new blob is removed.
+    """
+    try:
+        result = await supabase.rpc("swap_profile_asset", {
+            "p_user_id": user["id"],
+            "p_field": field,
+            "p_new_url": file_url,
+            "p_email": user.get("email")
+        }).execute()
+    except Exception:
+        await delete_blob_from_url(file_url)
+        raise
+
+    if result.data:
+        background_tasks.add_task(delete_blob_from_url, result.data)
+
 # ============================================
 # Endpoints
 # ============================================
@@ -196,7 +247,7 @@ async def update_my_profile(
     api_logger.info(f"Updating profile for user: {user['id']}")
     
     try:
-        update_dict = {k: v for k, v in updates.dict().items() if v is not None}
+        update_dict = updates.model_dump(exclude_none=True)
         
         update_dict["id"] = user["id"]
         update_dict["email"] = user.get("email")
@@ -231,6 +282,7 @@ async def update_my_profile(
 
 @router.post("/upload/resume")
 async def upload_resume(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user: dict = Depends(get_user_with_role),
     supabase: CustomSupabaseClient = Depends(get_supabase)
@@ -244,19 +296,10 @@ async def upload_resume(
     container = os.environ.get("AZURE_PROFILE_STORAGE_CONTAINER_NAME", "candidate-details")
     
     try:
-        # Check for existing resume to delete? 
-        # Optional enhancement: delete old resume
-        current = await supabase.table("candidate_profiles").select("resume_url").eq("id", user["id"]).single().execute()
-        if current.data and current.data.get("resume_url"):
-            await delete_blob_from_url(current.data["resume_url"])
-
+        # Upload first so a failed upload never leaves the profile without a resume;
+        # the old blob is deleted in the background once the profile points at the new one
         file_url = await upload_to_azure_blob(file, container)
-        
-        await supabase.table("candidate_profiles").upsert({
-            "id": user["id"],
-            "resume_url": file_url,
-            "email": user.get("email")
-        }).execute()
+        await swap_profile_asset(supabase, user, "resume_url", file_url, background_tasks)
         
         return {"url": sign_blob_url(file_url)}
         
@@ -268,6 +311,7 @@ async def upload_resume(
 
 @router.post("/upload/picture")
 async def upload_picture(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user: dict = Depends(get_user_with_role),
     supabase: CustomSupabaseClient = Depends(get_supabase)
@@ -281,28 +325,12 @@ async def upload_picture(
     container = os.environ.get("AZURE_PROFILE_STORAGE_CONTAINER_NAME", "candidate-details")
     
     try:
-        # 1. Fetch current profile to get old picture URL
-        current = await supabase.table("candidate_profiles").select("profile_pic_url").eq("id", user["id"]).single().execute()
-        
-        # 2. Delete old blob if it exists
-        if current.data and current.data.get("profile_pic_url"):
-            await delete_blob_from_url(current.data["profile_pic_url"])
-
-        # 3. Upload new blob
+        # 1. Upload new blob
         file_url = await upload_to_azure_blob(file, container)
         
-        # 4. Update 'candidate_profiles'
-        await supabase.table("candidate_profiles").upsert({
-            "id": user["id"],
-            "profile_pic_url": file_url,
-            "email": user.get("email")
-        }).execute()
-
-        # 5. Update 'profiles' table (Auth/Navbar sync)
-        # Note: profiles table uses 'avatar_url'
-        await supabase.table("profiles").update({
-            "avatar_url": file_url
-        }).eq("id", user["id"]).execute()
+        # 2. Update 'candidate_profiles' and 'profiles.avatar_url' (Auth/Navbar sync),
+        #    then delete the old blob in the background
+        await swap_profile_asset(supabase, user, "profile_pic_url", file_url, background_tasks)
         
         return {"url": sign_blob_url(file_url)}
         
@@ -1,25 +1,15 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
-from openai import AsyncAzureOpenAI
-import os
-
 from typing import List, Optional, Dict
 
 from dependencies import get_user_with_role
 from core.logging import api_logger, log_error
+# Same pooled HTTP/2 client and deployment as assessment scoring (client is None when not configured)
+from agents.scoring_agent import client, deployment_name as DEPLOYMENT_NAME
 
 router = APIRouter()
 
-# Initialize Azure OpenAI Client
-client = AsyncAzureOpenAI(
-    api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
-    api_version=os.environ.get("AZURE_OPENAI_API_VERSION", "2024-08-01-preview"),
-    azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT")
-)
-
-DEPLOYMENT_NAME = os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o")
-
 class GenerateRequest(BaseModel):
     field_name: str = Field(..., description="Field to generate content for (description, responsibilities, requirements, technical_questions)")
     context: str = Field(..., description="Job Title and basic context")
@@ -47,7 +37,7 @@ async def generate_content(
     api_logger.info(f"Generating content for {request.field_name} (User: {user['id']})")
     
     try:
-        if not os.environ.get("AZURE_OPENAI_API_KEY"):
+        if client is None:
              # Mock response if no key (for dev/demo without cost)
              # return GenerateResponse(content="AI key not configured. This is a placeholder.")
              raise HTTPException(status_code=500, detail="Azure OpenAI API Key not configured")
@@ -1,7 +1,7 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
-from datetime import datetime
+from datetime import datetime, timezone
 
 from dependencies import get_supabase, CustomSupabaseClient, verify_hr_or_admin, get_user_with_role
 from routers.jobs import (
@@ -10,7 +10,8 @@ from routers.jobs import (
     JobRoleResponse, 
     TechnicalQuestion, 
     JobResponsibility,
-    JobSkill
+    JobSkill,
+    invalidate_job_status
 )
 from core.logging import api_logger, db_logger, log_error, auth_logger
 
@@ -169,8 +170,7 @@ async def update_employee_job(
              raise HTTPException(status_code=409, detail="Job has been modified by another user")
 
         # 3. Prepare Update Data
-        update_data = {k: v for k, v in updates.dict().items() 
-                       if v is not None and k not in ["current_version", "technical_questions", "responsibilities", "skills"]}
+        update_data = updates.model_dump(exclude_none=True, exclude={"current_version", "technical_questions", "responsibilities", "skills"})
         
         if existing["status"] == "approved":
             update_data["status"] = "pending"
@@ -178,10 +178,11 @@ async def update_employee_job(
             update_data["approved_at"] = None
         
         update_data["version"] = existing.get("version", 1) + 1
-        update_data["updated_at"] = datetime.utcnow().isoformat()
+        update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
         
         if update_data:
             await supabase.table("job_roles").update(update_data).eq("id", job_id).execute()
+            invalidate_job_status(job_id)
             
         # 4. Update Related Tables (Full Replace Strategy)
         if updates.technical_questions is not None:
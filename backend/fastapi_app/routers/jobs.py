@@ -20,7 +20,9 @@ Endpoints:
 from fastapi import APIRouter, Depends, HTTPException, status, Header
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import datetime, timezone
+from cachetools import TTLCache
+from postgrest.exceptions import APIError
 import os
 
 from dependencies import get_supabase, CustomSupabaseClient, get_user_with_role, verify_hr_or_admin
@@ -28,6 +30,15 @@ from core.logging import api_logger, db_logger, log_error, auth_logger
 
 router = APIRouter()
 
+# status / is_open per job for the apply path; mutations below invalidate,
+# the short TTL bounds staleness across workers
+JOB_STATUS_CACHE_TTL_SECONDS = 30
+_job_status_cache: TTLCache = TTLCache(maxsize=10_000, ttl=JOB_STATUS_CACHE_TTL_SECONDS)
+
+def invalidate_job_status(job_id: str) -> None:
+    """Drop a job's cached status after it is updated, approved, rejected, closed or deleted."""
+    _job_status_cache.pop(job_id, None)
+
 
 # ============================================
 # Pydantic Models
@@ -483,7 +494,7 @@ async def update_job(
             )
         
         # Build update dict (exclude current_version and technical_questions from update data)
-        update_dict = {k: v for k, v in updates.dict().items() if v is not None and k not in ["current_version", "technical_questions"]}
+        update_dict = updates.model_dump(exclude_none=True, exclude={"current_version", "technical_questions"})
         
         if not update_dict:
             return job
@@ -507,7 +518,7 @@ async def update_job(
             update_dict["approved_at"] = None
             api_logger.info(f"Job {job_id} status reset to pending due to edit")
         
-        update_dict["updated_at"] = datetime.utcnow().isoformat()
+        update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
         update_dict["version"] = db_version + 1  # Increment version
         
         # Conditional update with version check for atomicity
@@ -516,6 +527,7 @@ async def update_job(
             query = query.eq("version", current_version)
         
         result = await query.execute()
+        invalidate_job_status(job_id)
         
         # Check if update succeeded (might fail due to race condition)
         if not result.data:
@@ -604,6 +616,7 @@ async def delete_job(
             )
         
         await supabase.table("job_roles").delete().eq("id", job_id).execute()
+        invalidate_job_status(job_id)
         
         db_logger.info(f"Job deleted: {job_id}")
         return None
@@ -647,7 +660,7 @@ async def approve_job(
                 detail="Job is already approved"
             )
         
-        now = datetime.utcnow().isoformat()
+        now = datetime.now(timezone.utc).isoformat()
         db_version = existing.data.get("version", 1)
         
         # Update job status with version increment
@@ -661,6 +674,7 @@ async def approve_job(
             })\
             .eq("id", job_id)\
             .execute()
+        invalidate_job_status(job_id)
         
         # Update pending approval request
         await supabase.table("approval_requests")\
@@ -716,7 +730,7 @@ async def reject_job(
                 detail="Job is already rejected"
             )
         
-        now = datetime.utcnow().isoformat()
+        now = datetime.now(timezone.utc).isoformat()
         db_version = existing.data.get("version", 1)
         
         # Update job status with version increment
@@ -730,6 +744,7 @@ async def reject_job(
             })\
             .eq("id", job_id)\
             .execute()
+        invalidate_job_status(job_id)
         
         # Update pending approval request
         await supabase.table("approval_requests")\
@@ -766,7 +781,7 @@ async def close_job(
     api_logger.info(f"Closing job: {job_id} by user: {user['id']}")
     
     try:
-        now = datetime.utcnow().isoformat()
+        now = datetime.now(timezone.utc).isoformat()
         
         result = await supabase.table("job_roles")\
             .update({
@@ -775,6 +790,7 @@ async def close_job(
             })\
             .eq("id", job_id)\
             .execute()
+        invalidate_job_status(job_id)
         
         if not result.data:
             raise HTTPException(
@@ -806,39 +822,30 @@ async def apply_for_job(
     api_logger.info(f"User {user['id']} applying for job: {job_id}")
     
     try:
-        # Verify job exists and is open
-        job = await supabase.table("job_roles")\
-            .select("status, is_open")\
-            .eq("id", job_id)\
-            .single()\
-            .execute()
-        
-        if not job.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Job not found"
-            )
+        # Verify job exists and is open (cached briefly; unknown jobs are not cached)
+        job = _job_status_cache.get(job_id)
+        if job is None:
+            result = await supabase.table("job_roles")\
+                .select("status, is_open")\
+                .eq("id", job_id)\
+                .limit(1)\
+                .execute()
+            
+            if not result.data:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Job not found"
+                )
+            job = _job_status_cache[job_id] = result.data[0]
         
-        if job.data["status"] != "approved" or not job.data["is_open"]:
+        if job["status"] != "approved" or not job["is_open"]:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="This job is not accepting applications"
             )
         
-        # Check for existing application
-        existing = await supabase.table("job_applications")\
-            .select("id")\
-            .eq("job_id", job_id)\
-            .eq("applicant_id", user["id"])\
-            .execute()
-        
-        if existing.data:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="You have already applied for this job"
-            )
-        
-        # Create application
+        # Create application; duplicates are rejected by the unique_job_applicant
+        # constraint (job_id, applicant_id) rather than a separate lookup
         result = await supabase.table("job_applications").insert({
             "job_id": job_id,
             "applicant_id": user["id"],
@@ -860,6 +867,17 @@ async def apply_for_job(
         
     except HTTPException:
         raise
+    except APIError as e:
+        if e.code == "23505":  # unique_violation
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="You have already applied for this job"
+            )
+        log_error(e, context="apply_for_job")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to submit application"
+        )
     except Exception as e:
         log_error(e, context="apply_for_job")
         raise HTTPException(
@@ -0,0 +1,58 @@
+-- Migration: Admin dashboard stats RPC
+-- Purpose: Compute every /admin/stats aggregate in one round trip instead of
+--          five count queries plus a full scan of assessment_scores
+-- Date: 2026-10-16
+
+CREATE OR REPLACE FUNCTION public.get_admin_stats()
+RETURNS json
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH profile_counts AS (
+        SELECT
+            count(*) FILTER (WHERE role = 'candidate') AS total_candidates,
+            count(*) FILTER (WHERE role = 'employee')  AS total_employees
+        FROM profiles
+    ),
+    assessment_counts AS (
+        SELECT
+            count(*) AS total_assessments,
+            count(*) FILTER (WHERE created_at >= (now() AT TIME ZONE 'utc')::date) AS assessments_today
+        FROM assessments
+    ),
+    scored AS (
+        SELECT
+            total_score,
+            -- Upper-inclusive buckets: (..20], (20..40], (40..60], (60..80], (80..]
+            CASE
+                WHEN total_score <= 20 THEN 0
+                WHEN total_score <= 40 THEN 1
+                WHEN total_score <= 60 THEN 2
+                WHEN total_score <= 80 THEN 3
+                ELSE 4
+            END AS bucket
+        FROM assessment_scores
+        WHERE total_score IS NOT NULL
+    ),
+    buckets(bucket, name) AS (
+        VALUES (0, '0-20%'), (1, '20-40%'), (2, '40-60%'), (3, '60-80%'), (4, '80-100%')
+    )
+    SELECT json_build_object(
+        'total_candidates',  pc.total_candidates,
+        'total_employees',   pc.total_employees,
+        'total_assessments', ac.total_assessments,
+        'assessments_today', ac.assessments_today,
+        'average_score',     COALESCE((SELECT avg(total_score) FROM scored), 0),
+        'score_distribution', (
+            SELECT json_agg(json_build_object('name', b.name, 'count', COALESCE(s.count, 0)) ORDER BY b.bucket)
+            FROM buckets b
+            LEFT JOIN (SELECT bucket, count(*) AS count FROM scored GROUP BY bucket) s USING (bucket)
+        )
+    )
+    FROM profile_counts pc, assessment_counts ac;
+$$;
+
+REVOKE ALL ON FUNCTION public.get_admin_stats() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.get_admin_stats() TO service_role;
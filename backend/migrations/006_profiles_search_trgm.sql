@@ -0,0 +1,12 @@
+-- Migration: Trigram indexes for admin user search
+-- Purpose: Let GET /admin/users?search= use an index for its
+--          email/full_name ILIKE '%term%' filters instead of scanning profiles
+-- Date: 2026-10-16
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS profiles_email_trgm_idx
+    ON public.profiles USING gin (email gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS profiles_full_name_trgm_idx
+    ON public.profiles USING gin (full_name gin_trgm_ops);
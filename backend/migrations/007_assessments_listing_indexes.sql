@@ -0,0 +1,15 @@
+-- Migration: Indexes for the admin assessments listing
+-- Purpose: Serve GET /admin/assessments (ORDER BY created_at DESC LIMIT n with
+--          profiles and assessment_scores embedded) from an index scan
+-- Date: 2026-10-16
+
+-- Top-N by recency; INCLUDE covers the other listed columns and the profile join key
+CREATE INDEX IF NOT EXISTS assessments_created_at_desc_idx
+    ON public.assessments (created_at DESC) INCLUDE (user_id, status);
+
+-- Embedded score / response lookups per assessment (profiles(id) is the PK)
+CREATE INDEX IF NOT EXISTS assessment_scores_assessment_id_idx
+    ON public.assessment_scores (assessment_id);
+
+CREATE INDEX IF NOT EXISTS assessment_responses_assessment_id_created_at_idx
+    ON public.assessment_responses (assessment_id, created_at);
@@ -0,0 +1,69 @@
+-- Migration: Apply-for-job RPC
+-- Purpose: Validate the job, reject duplicates, copy the candidate's profile
+--          fields and insert the application in one round trip and one transaction
+-- Date: 2026-10-16
+
+-- Errors are raised with SQLSTATEs the API maps to HTTP codes:
+--   no_data_found (P0002)    -> 404 job not found
+--   check_violation (23514)  -> 400 job not accepting applications
+--   unique_violation (23505) -> 409 already applied
+CREATE OR REPLACE FUNCTION public.apply_for_job(
+    p_job_id uuid,
+    p_applicant_id uuid,
+    p_cover_letter text DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_status text;
+    v_is_open boolean;
+    v_profile record;
+    v_application job_applications%ROWTYPE;
+BEGIN
+    -- FOR SHARE keeps the job from being closed while we insert
+    SELECT status, is_open INTO v_status, v_is_open
+    FROM job_roles
+    WHERE id = p_job_id
+    FOR SHARE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Job not found' USING ERRCODE = 'no_data_found';
+    END IF;
+
+    IF v_status <> 'approved' OR NOT v_is_open THEN
+        RAISE EXCEPTION 'Job is not accepting applications' USING ERRCODE = 'check_violation';
+    END IF;
+
+    -- Serialize concurrent submissions of the same (job, applicant) pair
+    PERFORM pg_advisory_xact_lock(hashtext(p_job_id::text), hashtext(p_applicant_id::text));
+
+    IF EXISTS (
+        SELECT 1 FROM job_applications
+        WHERE job_id = p_job_id AND applicant_id = p_applicant_id
+    ) THEN
+        RAISE EXCEPTION 'You have already applied for this job' USING ERRCODE = 'unique_violation';
+    END IF;
+
+    SELECT resume_url, phone, linkedin_url INTO v_profile
+    FROM candidate_profiles
+    WHERE id = p_applicant_id;
+
+    INSERT INTO job_applications (
+        job_id, applicant_id, status, cover_letter,
+        resume_url, phone, linkedin_url, created_at
+    )
+    VALUES (
+        p_job_id, p_applicant_id, 'submitted', p_cover_letter,
+        v_profile.resume_url, v_profile.phone, v_profile.linkedin_url, now()
+    )
+    RETURNING * INTO v_application;
+
+    RETURN to_jsonb(v_application);
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.apply_for_job(uuid, uuid, text) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.apply_for_job(uuid, uuid, text) TO service_role;
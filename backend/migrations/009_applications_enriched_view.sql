@@ -0,0 +1,35 @@
+-- Migration: Enriched applications view
+-- Purpose: Serve GET /api/applications (HR/Admin list) in one query, with the
+--          job title and candidate details joined in Postgres instead of a
+--          second candidate_profiles lookup merged in Python
+-- Date: 2026-10-16
+
+-- job_applications.applicant_id references auth.users, not candidate_profiles,
+-- so PostgREST cannot embed the profile; the join lives in this view instead.
+-- security_invoker keeps the caller's RLS in force for the underlying tables.
+CREATE OR REPLACE VIEW public.v_applications_enriched
+WITH (security_invoker = on) AS
+SELECT
+    a.id,
+    a.job_id,
+    a.applicant_id,
+    a.status,
+    a.cover_letter,
+    -- Fall back to the candidate profile when the application has no value
+    COALESCE(NULLIF(a.resume_url, ''), cp.resume_url, a.resume_url) AS resume_url,
+    a.phone,
+    COALESCE(NULLIF(a.linkedin_url, ''), cp.linkedin_url, a.linkedin_url) AS linkedin_url,
+    a.feedback,
+    a.created_at,
+    a.updated_at,
+    json_build_object('title', jr.title) AS job_roles,
+    jr.title AS job_title,
+    CASE WHEN cp.id IS NULL THEN 'Unknown' ELSE cp.full_name END AS candidate_name,
+    CASE WHEN cp.id IS NULL THEN '' ELSE cp.email END AS candidate_email
+FROM public.job_applications a
+LEFT JOIN public.job_roles jr ON jr.id = a.job_id
+LEFT JOIN public.candidate_profiles cp ON cp.id = a.applicant_id;
+
+-- Newest-first listing
+CREATE INDEX IF NOT EXISTS idx_job_applications_created_at
+ON public.job_applications(created_at DESC);
@@ -0,0 +1,12 @@
+-- Migration: Applicant listing index for job_applications
+-- Purpose: Serve GET /api/applications/me (applicant_id = ? ORDER BY created_at DESC)
+--          from an index scan instead of filtering then sorting
+-- Date: 2026-10-16
+
+-- (job_id, applicant_id) is already covered by the unique_job_applicant
+-- constraint from database/job_roles_migration.sql, which also backs the
+-- duplicate-application check.
+
+-- CONCURRENTLY avoids blocking inserts; run outside a transaction block
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_job_applications_applicant_created
+ON public.job_applications(applicant_id, created_at DESC);
@@ -0,0 +1,24 @@
+-- Migration: Flat assessment summaries view
+-- Purpose: Return GET /admin/assessments rows already shaped like
+--          AssessmentSummary instead of reshaping embedded JSON in Python
+-- Date: 2026-10-16
+
+CREATE OR REPLACE VIEW public.v_assessment_summaries
+WITH (security_invoker = on) AS
+SELECT
+    a.id,
+    a.user_id,
+    p.full_name AS user_name,
+    COALESCE(p.email, 'Unknown') AS user_email,
+    a.status,
+    s.total_score AS overall_score,
+    a.created_at
+FROM public.assessments a
+LEFT JOIN public.profiles p ON p.id = a.user_id
+-- At most one score row per assessment, so the listing never duplicates rows
+LEFT JOIN LATERAL (
+    SELECT total_score
+    FROM public.assessment_scores
+    WHERE assessment_id = a.id
+    LIMIT 1
+) s ON true;
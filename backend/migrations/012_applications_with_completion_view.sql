@@ -0,0 +1,24 @@
+-- Migration: Applications with assessment completion view
+-- Purpose: Serve GET /api/applications/me in one query, with the job title and
+--          the technical assessment completion flag computed in Postgres instead
+--          of a second technical_assessment_responses lookup merged in Python
+-- Date: 2026-10-16
+
+-- security_invoker keeps the caller's RLS in force for the underlying tables.
+CREATE OR REPLACE VIEW public.v_applications_with_completion
+WITH (security_invoker = on) AS
+SELECT
+    a.*,
+    json_build_object('title', jr.title) AS job_roles,
+    jr.title AS job_title,
+    EXISTS (
+        SELECT 1
+        FROM public.technical_assessment_responses r
+        WHERE r.application_id = a.id
+    ) AS technical_assessment_completed
+FROM public.job_applications a
+LEFT JOIN public.job_roles jr ON jr.id = a.job_id;
+
+
+-- The EXISTS probe is served by the unique (application_id, question_id)
+-- index from 002_create_technical_assessment_responses.sql.
@@ -0,0 +1,56 @@
+-- Migration: Swap profile asset RPC
+-- Purpose: Store a newly uploaded resume / profile picture URL and return the
+--          previous one in one round trip, so the API can delete the old blob
+--          afterwards instead of select -> upsert -> update
+-- Date: 2026-10-16
+
+-- p_field must be 'resume_url' or 'profile_pic_url'; anything else raises
+-- invalid_parameter_value (22023). A profile picture is mirrored to
+-- profiles.avatar_url for the navbar.
+CREATE OR REPLACE FUNCTION public.swap_profile_asset(
+    p_user_id uuid,
+    p_field text,
+    p_new_url text,
+    p_email text DEFAULT NULL
+)
+RETURNS text
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_old_url text;
+BEGIN
+    IF p_field NOT IN ('resume_url', 'profile_pic_url') THEN
+        RAISE EXCEPTION 'Unsupported profile asset: %', p_field USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    -- FOR UPDATE so concurrent uploads each get back the URL they replaced
+    SELECT CASE p_field WHEN 'resume_url' THEN resume_url ELSE profile_pic_url END
+    INTO v_old_url
+    FROM candidate_profiles
+    WHERE id = p_user_id
+    FOR UPDATE;
+
+    INSERT INTO candidate_profiles AS cp (id, email, resume_url, profile_pic_url)
+    VALUES (
+        p_user_id,
+        p_email,
+        CASE WHEN p_field = 'resume_url' THEN p_new_url END,
+        CASE WHEN p_field = 'profile_pic_url' THEN p_new_url END
+    )
+    ON CONFLICT (id) DO UPDATE SET
+        email = EXCLUDED.email,
+        resume_url = CASE WHEN p_field = 'resume_url' THEN p_new_url ELSE cp.resume_url END,
+        profile_pic_url = CASE WHEN p_field = 'profile_pic_url' THEN p_new_url ELSE cp.profile_pic_url END;
+
+    IF p_field = 'profile_pic_url' THEN
+        UPDATE profiles SET avatar_url = p_new_url WHERE id = p_user_id;
+    END IF;
+
+    RETURN v_old_url;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.swap_profile_asset(uuid, text, text, text) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.swap_profile_asset(uuid, text, text, text) TO service_role;